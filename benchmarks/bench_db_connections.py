@@ -0,0 +1,95 @@
+"""
+Connection setup overhead and query-log memory growth.
+
+Run from the project root against the configured database:
+
+    python -m benchmarks.bench_db_connections [--requests N] [--queries N]
+
+Each simulated request fires request_started/request_finished around one
+query, which is what Django does between requests, so CONN_MAX_AGE and
+pooling behave as they would under a real server.
+"""
+
+import argparse
+import os
+import tracemalloc
+from time import perf_counter
+
+import django
+
+from core import settings_module
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module())
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.signals import request_finished, request_started  # noqa: E402
+from django.db import connection, reset_queries  # noqa: E402
+
+MODES = {
+    "new connection per request": {"CONN_MAX_AGE": 0, "OPTIONS": {}},
+    "persistent (CONN_MAX_AGE=600)": {"CONN_MAX_AGE": 600, "OPTIONS": {}},
+    "psycopg pool": {"CONN_MAX_AGE": 0, "OPTIONS": {"pool": {"min_size": 1}}},
+}
+
+
+def simulate_requests(requests):
+    start = perf_counter()
+    for _ in range(requests):
+        request_started.send(sender=None)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        request_finished.send(sender=None)
+    return (perf_counter() - start) / requests
+
+
+def connection_overhead(requests):
+    original = {
+        key: connection.settings_dict.get(key) for key in ("CONN_MAX_AGE", "OPTIONS")
+    }
+    results = {}
+    for mode, overrides in MODES.items():
+        connection.close()
+        connection.settings_dict.update(overrides)
+        try:
+            simulate_requests(5)
+            results[mode] = simulate_requests(requests)
+        finally:
+            connection.close()
+            connection.close_pool()
+    connection.settings_dict.update(original)
+    return results
+
+
+def query_log_growth(queries, debug):
+    settings.DEBUG = debug
+    reset_queries()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    with connection.cursor() as cursor:
+        for i in range(queries):
+            cursor.execute("SELECT %s", [i])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    reset_queries()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"Connection overhead over {args.requests} requests:")
+    for mode, seconds in connection_overhead(args.requests).items():
+        print(f"  {mode:<32} {seconds * 1e6:10.1f} us/request")
+
+    print(f"Memory retained after {args.queries} queries in one request:")
+    for debug in (True, False):
+        growth = query_log_growth(args.queries, debug)
+        print(f"  DEBUG={debug!s:<27} {growth / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Membership join versus cached visible-project-id set.
+
+Run from the project root against the configured database:
+
+    python -m benchmarks.bench_membership [--projects N] [--repeat N]
+
+Synthetic projects, tasks and comments are bulk-inserted inside a
+transaction that is rolled back at the end. For users on 1, 10 and 200
+projects the task and comment list filters are timed both as a join
+through the team_members table and as `project_id__in` on the cached set.
+"""
+
+import argparse
+import os
+from datetime import date
+from time import perf_counter
+
+import django
+
+from core import settings_module
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module())
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import transaction  # noqa: E402
+
+from ticketapi.membership import Membership, visible_project_ids  # noqa: E402
+from ticketapi.models import Comments, Project, Task  # noqa: E402
+
+User = get_user_model()
+
+MEMBERSHIP_SIZES = [1, 10, 200]
+
+
+def populate(projects, tasks_per_project, comments_per_task):
+    author = User.objects.create(email="bench-author@example.com", username="author")
+    created = Project.objects.bulk_create(
+        Project(title=f"Bench {i}", description="", start_date=date(2024, 1, 1))
+        for i in range(projects)
+    )
+    tasks = Task.objects.bulk_create(
+        Task(title=f"Task {i}", description="", project=project)
+        for project in created
+        for i in range(tasks_per_project)
+    )
+    Comments.objects.bulk_create(
+        Comments(text="Bench", author=author, task=task, project_id=task.project_id)
+        for task in tasks
+        for _ in range(comments_per_task)
+    )
+
+    members = {}
+    for size in MEMBERSHIP_SIZES:
+        user = User.objects.create(
+            email=f"bench-{size}@example.com", username=f"bench-{size}"
+        )
+        Membership.objects.bulk_create(
+            Membership(project_id=project.id, customuser_id=user.id)
+            for project in created[:size]
+        )
+        members[size] = user
+    return members
+
+
+def timed(build, repeat):
+    list(build())
+    start = perf_counter()
+    for _ in range(repeat):
+        list(build())
+    return (perf_counter() - start) / repeat
+
+
+def plans(user):
+    return {
+        "tasks": (
+            lambda: Task.objects.filter(project__team_members=user).values_list("id"),
+            lambda: Task.objects.filter(
+                project_id__in=visible_project_ids(user)
+            ).values_list("id"),
+        ),
+        "comments": (
+            lambda: Comments.objects.filter(
+                task__project__team_members=user
+            ).values_list("id"),
+            lambda: Comments.objects.filter(
+                project_id__in=visible_project_ids(user)
+            ).values_list("id"),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=20, help="tasks per project")
+    parser.add_argument("--comments", type=int, default=3, help="comments per task")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with transaction.atomic():
+        members = populate(
+            max(args.projects, MEMBERSHIP_SIZES[-1]), args.tasks, args.comments
+        )
+        print(f"{'projects':>8} {'list':<9} {'join':>12} {'id set':>12}")
+        for size, user in members.items():
+            for name, (join, id_set) in plans(user).items():
+                print(
+                    f"{size:>8} {name:<9} "
+                    f"{timed(join, args.repeat) * 1000:9.2f} ms "
+                    f"{timed(id_set, args.repeat) * 1000:9.2f} ms"
+                )
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
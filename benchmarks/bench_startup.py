@@ -0,0 +1,98 @@
+"""
+Startup profile of django.setup() and manage.py commands.
+
+Run from the project root:
+
+    python -m benchmarks.bench_startup [--repeat N] [--top N]
+
+Each target is started --repeat times in a fresh interpreter with
+`python -X importtime`. The fastest wall time and the number of modules
+imported are reported, with the packages that spent the most time in
+their own imports and the slowest imports made directly by the target.
+The manage.py targets connect to the configured database but change
+nothing in it.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+from time import perf_counter
+
+from core import settings_module
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PREFIX = "import time:"
+
+TARGETS = {
+    "django.setup()": ["-c", "import django; django.setup()"],
+    "manage.py check": ["manage.py", "check"],
+    # A cron command; nothing is old enough to be purged.
+    "manage.py purge_deleted": [
+        "manage.py",
+        "purge_deleted",
+        "--older-than",
+        str(100 * 365 * 86400),
+    ],
+}
+
+
+def parse_importtime(output):
+    """`(self us, cumulative us, depth, module)` rows of -X importtime output"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith(PREFIX) or "[us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix(PREFIX).split("|")
+        # Names are indented two spaces per level below the importer.
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(own), int(cumulative), depth, name.strip()))
+    return rows
+
+
+def run(args):
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.setdefault("DJANGO_SETTINGS_MODULE", settings_module())
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return perf_counter() - start, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for label, target in TARGETS.items():
+        best, rows = min(run(target) for _ in range(args.repeat))
+        print(f"{label}: {best * 1000:.0f} ms, {len(rows)} modules")
+
+        packages = Counter()
+        for own, _, _, name in rows:
+            packages[name.split(".")[0]] += own
+        print("  self time by package:")
+        for package, own in packages.most_common(args.top):
+            print(f"    {own / 1000:8.1f} ms  {package}")
+
+        # Depth 0 rows are the imports the target itself made.
+        direct = sorted(
+            (row for row in rows if row[2] == 0), key=lambda row: row[1], reverse=True
+        )
+        print("  slowest direct imports (cumulative):")
+        for _, cumulative, _, name in direct[: args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Task metrics computation over synthetic transition history.
+
+Run from the project root (no database access is needed):
+
+    python -m benchmarks.bench_task_metrics [--rows N] [--chunk-size N]
+
+Transitions are generated in chunks shaped like those `compute_task_metrics`
+reads from the database and fed to TaskMetricsAccumulator. A row-by-row
+Python loop over a smaller sample is timed alongside for comparison.
+"""
+
+import argparse
+import os
+from time import perf_counter
+
+import django
+
+from core import settings_module
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module())
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from ticketapi.metrics import COLUMNS, HOUR, TaskMetricsAccumulator  # noqa: E402
+
+TRANSITIONS_PER_TASK = 6
+
+
+def synthetic_chunks(rows, chunk_size, projects, seed=0):
+    """Tasks walking OPEN -> CLOSED with random gaps, in task order"""
+    rng = np.random.default_rng(seed)
+    tasks = rows // TRANSITIONS_PER_TASK
+    tasks_per_chunk = max(chunk_size // TRANSITIONS_PER_TASK, 1)
+    first_task = 0
+    while first_task < tasks:
+        count = min(tasks_per_chunk, tasks - first_task)
+        task_ids = np.arange(first_task, first_task + count)
+        gaps = rng.exponential(24 * HOUR, (count, TRANSITIONS_PER_TASK))
+        gaps[:, 0] = rng.uniform(0, 365 * 24 * HOUR, count)
+        yield {
+            "project": np.repeat(task_ids % projects, TRANSITIONS_PER_TASK),
+            "task": np.repeat(task_ids, TRANSITIONS_PER_TASK),
+            "status": np.tile(np.arange(TRANSITIONS_PER_TASK, dtype=np.int8), count),
+            "at": np.cumsum(gaps, axis=1).ravel() + 1.6e9,
+            "assignee": np.repeat(task_ids % 500, TRANSITIONS_PER_TASK),
+        }
+        first_task += count
+
+
+def vectorized(rows, chunk_size, projects):
+    accumulator = TaskMetricsAccumulator()
+    generated = 0.0
+    start = perf_counter()
+    chunks = synthetic_chunks(rows, chunk_size, projects)
+    while True:
+        begin = perf_counter()
+        chunk = next(chunks, None)
+        generated += perf_counter() - begin
+        if chunk is None:
+            break
+        accumulator.add(chunk)
+    metrics = accumulator.results()
+    return perf_counter() - start - generated, len(metrics)
+
+
+def row_by_row(rows, projects):
+    """The same metrics computed with dicts and a Python loop"""
+    (chunk,) = synthetic_chunks(rows, rows, projects)
+    records = zip(*(chunk[name].tolist() for name in COLUMNS))
+    start = perf_counter()
+    in_status, lead, throughput = {}, {}, {}
+    previous = None
+    for project, task, status, at, assignee in records:
+        if previous and previous[1] == task:
+            key = (project, previous[2])
+            in_status.setdefault(key, []).append(at - previous[3])
+        else:
+            started = at
+        if status == TRANSITIONS_PER_TASK - 1:
+            lead.setdefault(project, []).append(at - started)
+            week = (project, int(at // (7 * 24 * HOUR)), assignee)
+            throughput[week] = throughput.get(week, 0) + 1
+        previous = (project, task, status, at)
+    for values in (*in_status.values(), *lead.values()):
+        np.percentile(values, (50, 85, 95))
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--baseline-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    seconds, metrics = vectorized(args.rows, args.chunk_size, args.projects)
+    print(
+        f"NumPy, {args.rows:,} rows in chunks of {args.chunk_size:,}: "
+        f"{seconds:.2f}s ({args.rows / seconds:,.0f} rows/s), {metrics:,} metrics"
+    )
+    seconds = row_by_row(args.baseline_rows, args.projects)
+    print(
+        f"Python loop, {args.baseline_rows:,} rows: "
+        f"{seconds:.2f}s ({args.baseline_rows / seconds:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+
+
+def settings_module():
+    """Settings module for the environment named by DJANGO_ENV."""
+    if os.getenv("DJANGO_ENV") == "production":
+        return "core.settings_production"
+    return "core.settings"
@@ -13,13 +13,16 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Local development reads variables from a .env file next to manage.py.
+# Deployed workers get them from the environment and skip python-dotenv.
+if (BASE_DIR / ".env").exists():
+    from dotenv import load_dotenv
+
+    load_dotenv(BASE_DIR / ".env")
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -41,8 +44,11 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# SimpleAdminConfig does not autodiscover admin modules when apps load;
+# core.urls does, so commands and workers that never route a request skip
+# the admin registrations.
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "django.contrib.admin.apps.SimpleAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -50,12 +56,15 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "api",
     "rest_framework",
-    "debug_toolbar",
     "rest_framework_simplejwt.token_blacklist",
     "ticketapi",
 ]
 
 MIDDLEWARE = [
+    "ticketapi.instrumentation.PerformanceMiddleware",
+    "ticketapi.querylog.QueryInspectionMiddleware",
+    "ticketapi.db_routing.ReplicaRoutingMiddleware",
+    "ticketapi.throttling.RateLimitHeadersMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -63,13 +72,46 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# The debug toolbar is only loaded when DEBUG_TOOLBAR is set.
+if DEBUG and os.getenv("DEBUG_TOOLBAR"):
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
+    INTERNAL_IPS = ["127.0.0.1"]
+
+# Write routes in ticketapi.urls are throttled per user and per project with
+# the "<scope>.user" and "<scope>.project" rates, counted in the default cache.
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "tasks.user": "120/min",
+        "tasks.project": "600/min",
+        "comments.user": "60/min",
+        "comments.project": "300/min",
+        "documents.user": "30/min",
+        "documents.project": "120/min",
+    },
+}
+
+# Per-request timing exposed as Server-Timing headers and on /api/metrics/.
+# SAMPLE_RATE is the fraction of requests that are measured. Without a
+# METRICS_TOKEN the endpoint is only open when PUBLIC_METRICS is set.
+PERF_INSTRUMENTATION = {
+    "SAMPLE_RATE": float(os.getenv("PERF_SAMPLE_RATE", "1.0")),
+    "SERVER_TIMING": True,
+    "METRICS_TOKEN": os.getenv("METRICS_TOKEN"),
+    "PUBLIC_METRICS": True,
+}
+
+# Slow-query log and N+1 detection: queries slower than SLOW_QUERY_MS and query
+# shapes repeated REPEAT_THRESHOLD times in one request are logged.
+QUERY_INSPECTION = {
+    "SAMPLE_RATE": float(os.getenv("QUERY_INSPECTION_SAMPLE_RATE", "1.0")),
+    "SLOW_QUERY_MS": int(os.getenv("SLOW_QUERY_MS", "200")),
+    "REPEAT_THRESHOLD": 5,
 }
 
 ROOT_URLCONF = "core.urls"
@@ -106,6 +148,45 @@ DATABASES = {
     }
 }
 
+# Read replica used for reads of safe-method requests (ticketapi.db_routing).
+# Clients are pinned to the primary for REPLICA_PIN_SECONDS after a write.
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT")),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["ticketapi.db_routing.ReplicaRouter"]
+REPLICA_PIN_SECONDS = 5
+
+# Shared cache when REDIS_URL is set, otherwise a per-process in-memory cache.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Each user's visible project ids are cached this long. Membership changes
+# invalidate them, which only reaches other processes through a shared cache.
+MEMBERSHIP_CACHE_SECONDS = 300
+
+# User summaries ({id, username, email}) live in a per-process LRU for
+# LOCAL_TTL seconds in front of the shared cache.
+USER_SUMMARY_CACHE = {
+    "LOCAL_SIZE": int(os.getenv("USER_SUMMARY_LOCAL_SIZE", "2048")),
+    "LOCAL_TTL": 5,
+    "SHARED_TTL": 3600,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,5 +229,58 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "api.CustomUser"
+# Uploaded documents are only served through the document download view,
+# which checks project membership. Do not expose MEDIA_ROOT at MEDIA_URL
+# from the web server.
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+# TimeLine and Notification rows are kept in monthly partitions for this many
+# months; `manage.py archive_partitions` exports older ones to ARCHIVE_ROOT.
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "12"))
+ARCHIVE_ROOT = BASE_DIR / "archive"
+
+# /api/sync/ cursors are moved back by this much to catch late commits.
+SYNC_CURSOR_OVERLAP_SECONDS = 2
+
+# Unread notifications of one kind for the same task are coalesced within
+# COALESCE_SECONDS. DIGEST mode coalesces all of a user's tasks instead,
+# leaving at most one row per kind every DIGEST_SECONDS.
+NOTIFICATIONS = {
+    "COALESCE_SECONDS": 3600,
+    "DIGEST": os.getenv("NOTIFICATION_DIGEST", "false").lower() == "true",
+    "DIGEST_SECONDS": 86400,
+}
+
+# Outbound webhooks, sent by `manage.py deliver_webhooks`. Failed batches are
+# retried after BACKOFF_BASE * 2**(attempt - 1) seconds, capped at
+# BACKOFF_MAX, until MAX_ATTEMPTS. URLs must resolve to public addresses;
+# ALLOWED_NETWORKS lists internal networks receivers may still live in.
+WEBHOOKS = {
+    "BATCH_SIZE": 100,
+    "CONCURRENCY": 10,
+    "TIMEOUT": 10,
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF_BASE": 30,
+    "BACKOFF_MAX": 6 * 3600,
+    "ALLOWED_NETWORKS": [],
+}
+
+# /api/documents/<id>/download/ checks membership and then lets the web server
+# send the file: BACKEND "x-accel-redirect" for nginx (an internal location
+# at INTERNAL_PREFIX aliased to MEDIA_ROOT) or "x-sendfile" for Apache and
+# lighttpd. "django" streams it from the worker, with byte range support.
+DOCUMENT_DOWNLOADS = {
+    "BACKEND": os.getenv("DOCUMENT_DOWNLOAD_BACKEND", "django"),
+    "INTERNAL_PREFIX": "/protected/media/",
+}
+
+# `manage.py index_documents` extracts text from queued uploads in WORKERS
+# processes, reading at most MAX_BYTES of each file and keeping up to
+# MAX_TERMS distinct terms for /api/projects/<id>/documents/search/.
+DOCUMENT_INDEXING = {
+    "WORKERS": int(os.getenv("DOCUMENT_INDEX_WORKERS", "2")),
+    "BATCH_SIZE": 50,
+    "MAX_BYTES": 50 * 1024 * 1024,
+    "MAX_TERMS": 100_000,
+}
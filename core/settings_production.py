@@ -0,0 +1,72 @@
+"""
+Production settings for core project.
+
+Selected by setting DJANGO_ENV=production. Everything not overridden here
+comes from core.settings.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, INSTALLED_APPS, MIDDLEWARE
+
+SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "debug_toolbar"]
+
+MIDDLEWARE = [
+    middleware
+    for middleware in MIDDLEWARE
+    if not middleware.startswith("debug_toolbar.")
+]
+
+
+# Database
+# With DB_POOL set, connections come from a psycopg pool and are checked
+# before being handed out. Otherwise each worker keeps its connection open
+# for CONN_MAX_AGE seconds instead of reconnecting on every request.
+
+DATABASES = {
+    alias: {**config, "CONN_HEALTH_CHECKS": True} for alias, config in DATABASES.items()
+}
+
+for config in DATABASES.values():
+    if os.getenv("DB_POOL"):
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                "timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+            }
+        }
+    else:
+        config["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
+
+# Cached membership and webhook subscriptions are invalidated through the
+# cache, so every process must share it: REDIS_URL is required here.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+}
+
+
+# /api/metrics/ answers 403 unless METRICS_TOKEN is set.
+PERF_INSTRUMENTATION = {
+    "SAMPLE_RATE": float(os.getenv("PERF_SAMPLE_RATE", "0.1")),
+    "SERVER_TIMING": False,
+    "METRICS_TOKEN": os.getenv("METRICS_TOKEN"),
+}
+
+QUERY_INSPECTION = {
+    "SAMPLE_RATE": float(os.getenv("QUERY_INSPECTION_SAMPLE_RATE", "0.05")),
+    "SLOW_QUERY_MS": int(os.getenv("SLOW_QUERY_MS", "200")),
+    "REPEAT_THRESHOLD": 5,
+}
@@ -0,0 +1,15 @@
+"""
+Test settings for core project.
+
+Used by pytest (see pytest.ini). Everything not overridden here comes from
+core.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# A replica alias that mirrors the test database, so that replica routing
+# can be exercised through real connections. Reads only go to it in tests
+# that enable it with override_settings(DATABASE_REPLICAS=["replica"]).
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICAS = []
@@ -0,0 +1,108 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = "pin_primary"
+
+_current_request = ContextVar("routing_request", default=None)
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def pin_cache_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def authenticated_user_id(request):
+    """
+    Id of the user DRF authenticated for this request, if any. Django's lazy
+    session user is left alone: evaluating it would itself hit the database.
+    """
+    user = request.__dict__.get("user")
+    if user is None or isinstance(user, SimpleLazyObject) or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def is_pinned(request):
+    """
+    Whether the client wrote recently enough that replicas may not have
+    caught up, going by the pin cookie or the per-user cache marker.
+    """
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    user_id = authenticated_user_id(request)
+    return user_id is not None and bool(cache.get(pin_cache_key(user_id)))
+
+
+def pin_to_primary(request, response):
+    response.set_cookie(PIN_COOKIE, "1", max_age=pin_seconds(), httponly=True)
+    user_id = authenticated_user_id(request)
+    if user_id is not None:
+        cache.set(pin_cache_key(user_id), 1, pin_seconds())
+
+
+@contextmanager
+def routing_for(request):
+    token = _current_request.set(request)
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads made while handling a safe-method request to a replica,
+    unless the client is pinned to the primary after a recent write.
+    Everything else goes to the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        request = _current_request.get()
+        if not replicas or request is None or request.method not in SAFE_METHODS:
+            return None
+
+        pinned = getattr(request, "_replica_pinned", None)
+        if pinned is None:
+            pinned = is_pinned(request)
+            # Until DRF has authenticated the user only the cookie is known.
+            if authenticated_user_id(request) is not None:
+                request._replica_pinned = pinned
+        if pinned:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Make the current request visible to ReplicaRouter and pin clients to
+    the primary for REPLICA_PIN_SECONDS after a successful write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routing_for(request):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request, response)
+        return response
@@ -0,0 +1,122 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def get_config():
+    config = {
+        "BACKEND": "django",
+        "INTERNAL_PREFIX": "/protected/media/",
+        "CHUNK_SIZE": 64 * 1024,
+    }
+    config.update(getattr(settings, "DOCUMENT_DOWNLOADS", {}))
+    return config
+
+
+def parse_range(header, size):
+    """
+    Inclusive `(start, end)` of a single byte range, or None to send the
+    whole file. Multiple ranges are not supported and get the whole file.
+    Raises ValueError for a range that does not overlap the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # "bytes=-N": the last N bytes.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def read_range(file, start, length, chunk_size):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def offloaded_response(header, value, name):
+    """Empty response telling the front-end server which file to send"""
+    response = HttpResponse(
+        content_type=mimetypes.guess_type(name)[0] or "application/octet-stream"
+    )
+    response[header] = value
+    response["Content-Disposition"] = content_disposition_header(
+        True, os.path.basename(name)
+    )
+    return response
+
+
+def serve_file(request, name, storage=default_storage):
+    """
+    Response sending the stored file `name` as an attachment.
+
+    With the x-accel-redirect (nginx) or x-sendfile (Apache, lighttpd)
+    backend the front-end server sends the file, ranges included, and the
+    worker is free as soon as the headers are written. The django backend
+    streams from the worker: whole files through FileResponse, which the
+    WSGI server can hand to sendfile(), and single byte ranges in chunks.
+    """
+    config = get_config()
+    backend = config["BACKEND"]
+    if backend == "x-accel-redirect":
+        return offloaded_response(
+            "X-Accel-Redirect", config["INTERNAL_PREFIX"] + quote(name), name
+        )
+    if backend == "x-sendfile":
+        return offloaded_response("X-Sendfile", storage.path(name), name)
+
+    size = storage.size(name)
+    try:
+        # A validator we do not check could name an older version: send it all.
+        byte_range = (
+            None
+            if "If-Range" in request.headers
+            else parse_range(request.headers.get("Range"), size)
+        )
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = storage.open(name, "rb")
+    if byte_range is None:
+        response = FileResponse(
+            file, as_attachment=True, filename=os.path.basename(name)
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(file, start, end - start + 1, config["CHUNK_SIZE"]),
+            status=206,
+            content_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Disposition"] = content_disposition_header(
+            True, os.path.basename(name)
+        )
+    response["Accept-Ranges"] = "bytes"
+    return response
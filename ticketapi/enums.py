@@ -21,3 +21,38 @@ class EventType(Enum):
     CREATED = "created"
     UPDATED = "updated"
     DELETED = "deleted"
+
+
+class EventTarget(Enum):
+    PROJECT = "project"
+    TASK = "task"
+
+
+class SyncModel(Enum):
+    TASK = "task"
+    COMMENT = "comment"
+    DOCUMENT = "document"
+
+
+class MetricKind(Enum):
+    LEAD_TIME = "lead_time"
+    CYCLE_TIME = "cycle_time"
+    THROUGHPUT = "throughput"
+
+
+class NotificationKind(Enum):
+    ASSIGNED = "assigned"
+    COMMENT = "comment"
+
+
+class WebhookStatus(Enum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
+class IndexStatus(Enum):
+    PENDING = "pending"
+    INDEXED = "indexed"
+    UNSUPPORTED = "unsupported"
+    FAILED = "failed"
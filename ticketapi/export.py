@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comments, Task, TimeLine
+
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# Record type, columns read for it and how to select its rows for a project.
+EXPORT_SOURCES = [
+    (
+        "task",
+        ("id", "title", "description", "status", "assignee_id", "updated_at"),
+        lambda project_id: Task.objects.filter(project_id=project_id),
+    ),
+    (
+        "comment",
+        ("id", "task_id", "author_id", "text", "created_at", "updated_at"),
+        lambda project_id: Comments.objects.filter(
+            project_id=project_id, deleted_at__isnull=True
+        ),
+    ),
+    (
+        "timeline",
+        ("id", "event_type", "target_type", "target_id", "changes", "time"),
+        lambda project_id: TimeLine.objects.filter(project_id=project_id),
+    ),
+]
+
+CSV_COLUMNS = ["record_type"] + list(
+    dict.fromkeys(column for _, columns, _ in EXPORT_SOURCES for column in columns)
+)
+
+ROWS_PER_CHUNK = 500
+
+
+def project_rows(project_id, chunk_size=2000):
+    """
+    (record type, row dict) for every task, comment and timeline event of
+    the project, read through server-side cursors in primary key order.
+    """
+    for record_type, columns, rows in EXPORT_SOURCES:
+        queryset = rows(project_id).order_by("pk").values_list(*columns)
+        for values in queryset.iterator(chunk_size=chunk_size):
+            yield record_type, dict(zip(columns, values))
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for count, (record_type, row) in enumerate(rows, 1):
+        if row.get("changes") is not None:
+            row["changes"] = json.dumps(row["changes"], cls=DjangoJSONEncoder)
+        writer.writerow({"record_type": record_type, **row})
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(rows):
+    lines = []
+    for record_type, row in rows:
+        lines.append(
+            json.dumps({"record_type": record_type, **row}, cls=DjangoJSONEncoder)
+        )
+        if len(lines) == ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(project_id, export_format, compress=False):
+    rows = project_rows(project_id)
+    chunks = csv_chunks(rows) if export_format == "csv" else jsonl_chunks(rows)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode() for chunk in chunks)
@@ -0,0 +1,180 @@
+"""
+Text extraction for the document search index.
+
+This module runs in worker processes of `manage.py index_documents` and
+does not import Django: functions take a file path and return terms.
+"""
+
+import codecs
+import mmap
+import os
+import re
+import unicodedata
+import zlib
+
+TEXT_FORMATS = {".txt", ".md", ".markdown", ".csv"}
+PDF_FORMATS = {".pdf"}
+
+WORD_RE = re.compile(r"\w+")
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+CHUNK_SIZE = 1 << 20
+
+# PDF content streams and the text they show with Tj, ', " and TJ.
+PDF_STREAM_RE = re.compile(rb"(?<!end)stream\r?\n")
+PDF_ENDSTREAM = b"endstream"
+PDF_TEXT_RE = re.compile(
+    rb"(\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)\s*(?:Tj|'|\")"
+    rb"|\[((?:\\.|[^\\\]])*)\]\s*TJ",
+    re.S,
+)
+# Strings, and in TJ arrays the kerning numbers between them.
+PDF_STRING_RE = re.compile(
+    rb"\(((?:\\.|[^\\)])*)\)|<([0-9A-Fa-f\s]*)>|(-?\d+(?:\.\d*)?)", re.S
+)
+# TJ adjustments at least this far apart (in 1/1000 em) separate words.
+PDF_WORD_GAP = 200
+PDF_ESCAPE_RE = re.compile(rb"\\([0-7]{1,3}|\r\n|.)", re.S)
+PDF_ESCAPES = {
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"b": b"\b",
+    b"f": b"\f",
+    b"\n": b"",
+    b"\r": b"",
+    b"\r\n": b"",
+}
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def normalize(word):
+    """Index form of a word: NFKC case-folded, or None if too short or long"""
+    term = unicodedata.normalize("NFKC", word).casefold()
+    if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH:
+        return term
+    return None
+
+
+def terms_of(chunks, max_terms):
+    """Distinct normalized words of a stream of text chunks"""
+    terms = set()
+    carry = ""
+    for chunk in chunks:
+        text = carry + chunk
+        # A word at the end of a chunk may continue in the next one.
+        words = WORD_RE.findall(text)
+        if words and text.endswith(words[-1]):
+            carry = words.pop()
+        else:
+            carry = ""
+        for word in words:
+            term = normalize(word)
+            if term:
+                terms.add(term)
+        if len(terms) >= max_terms:
+            break
+    if carry and len(terms) < max_terms:
+        term = normalize(carry)
+        if term:
+            terms.add(term)
+    return sorted(terms)[:max_terms]
+
+
+def text_chunks(buffer, limit):
+    """UTF-8 text of a mapped file, decoded a chunk at a time"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    end = min(len(buffer), limit)
+    for start in range(0, end, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, end)
+        yield decoder.decode(buffer[start:stop])
+    yield decoder.decode(b"", final=True)
+
+
+def pdf_string(match):
+    literal, hexadecimal, kerning = match.groups()
+    if kerning is not None:
+        return b" " if -float(kerning) >= PDF_WORD_GAP else b""
+    if hexadecimal is not None:
+        digits = re.sub(rb"\s", b"", hexadecimal)
+        return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode())
+    return PDF_ESCAPE_RE.sub(
+        lambda escape: (
+            bytes([int(escape.group(1), 8) & 0xFF])
+            if escape.group(1)[:1].isdigit()
+            else PDF_ESCAPES.get(escape.group(1), escape.group(1))
+        ),
+        literal,
+    )
+
+
+def pdf_chunks(buffer, limit):
+    """
+    Text shown by the content streams of a PDF, uncompressed or Flate
+    encoded, with strings read as Latin-1. This covers the text layer of
+    simply encoded PDFs; fonts with custom encodings yield nothing useful.
+    """
+    if buffer[:5] != b"%PDF-":
+        raise UnsupportedFormat("Not a PDF file")
+    produced = 0
+    for match in PDF_STREAM_RE.finditer(buffer):
+        stream_start, start = match.span()
+        end = buffer.find(PDF_ENDSTREAM, start)
+        if end == -1:
+            break
+        object_start = max(buffer.rfind(b"obj", 0, stream_start), 0)
+        header = buffer[object_start:stream_start]
+        if b"/Image" in header:
+            continue
+        data = buffer[start:end]
+        if b"/FlateDecode" in header:
+            try:
+                data = zlib.decompressobj().decompress(data, limit)
+            except zlib.error:
+                continue
+        elif b"/Filter" in header:
+            continue
+        for shown in PDF_TEXT_RE.finditer(data):
+            strings = PDF_STRING_RE.finditer(shown.group(1) or shown.group(2))
+            text = b"".join(pdf_string(string) for string in strings)
+            produced += len(text)
+            yield text.decode("latin-1") + " "
+        if produced >= limit:
+            break
+
+
+def extract_terms(path, max_bytes, max_terms):
+    """
+    Normalized terms of the file at `path`, read through a read-only memory
+    map so that only the pages scanned are loaded.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_FORMATS:
+        chunks = text_chunks
+    elif extension in PDF_FORMATS:
+        chunks = pdf_chunks
+    else:
+        raise UnsupportedFormat(f"Cannot extract text from {extension or 'files'}")
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return terms_of(chunks(buffer, max_bytes), max_terms)
+
+
+def extract_document(job):
+    """
+    Process pool entry point: `(document id, path, max_bytes, max_terms)`
+    to `(document id, terms, error, unsupported)`.
+    """
+    document_id, path, max_bytes, max_terms = job
+    try:
+        return document_id, extract_terms(path, max_bytes, max_terms), "", False
+    except UnsupportedFormat as exc:
+        return document_id, [], str(exc), True
+    except (OSError, ValueError) as exc:
+        return document_id, [], f"{type(exc).__name__}: {exc}", False
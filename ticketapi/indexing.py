@@ -0,0 +1,107 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .enums import IndexStatus
+from .extraction import terms_of
+from .models import Document, DocumentIndex
+
+
+def get_config():
+    config = {
+        "WORKERS": os.cpu_count() or 1,
+        "BATCH_SIZE": 50,
+        "MAX_BYTES": 50 * 1024 * 1024,
+        "MAX_TERMS": 100_000,
+        "LEASE_SECONDS": 600,
+        "POLL_SECONDS": 5,
+    }
+    config.update(getattr(settings, "DOCUMENT_INDEXING", {}))
+    return config
+
+
+def queue_document(document_id):
+    """Mark a document for (re)indexing with a single upsert"""
+    DocumentIndex.objects.bulk_create(
+        [
+            DocumentIndex(
+                document_id=document_id, queued_at=timezone.now(), attempted_at=None
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["document"],
+        update_fields=["status", "error", "queued_at", "attempted_at"],
+    )
+
+
+def claim_batch(config):
+    """
+    Take pending documents, skipping rows other indexers hold, and stamp
+    `attempted_at` so that they are retried only after LEASE_SECONDS.
+
+    Returns extraction jobs for the worker processes, `{document id:
+    queued_at}` to check results against, and results for documents whose
+    storage has no local path.
+    """
+    now = timezone.now()
+    storage = Document._meta.get_field("file").storage
+    with transaction.atomic():
+        rows = list(
+            DocumentIndex.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(status=IndexStatus.PENDING.name)
+            .filter(
+                Q(attempted_at__isnull=True)
+                | Q(attempted_at__lt=now - timedelta(seconds=config["LEASE_SECONDS"]))
+            )
+            .order_by("queued_at")
+            .values_list("document_id", "queued_at", "document__file")[
+                : config["BATCH_SIZE"]
+            ]
+        )
+        DocumentIndex.objects.filter(pk__in=[row[0] for row in rows]).update(
+            attempted_at=now
+        )
+
+    jobs, queued, failed = [], {}, []
+    for document_id, queued_at, name in rows:
+        queued[document_id] = queued_at
+        try:
+            path = storage.path(name)
+        except NotImplementedError:
+            failed.append((document_id, [], "Storage has no local paths", False))
+            continue
+        jobs.append((document_id, path, config["MAX_BYTES"], config["MAX_TERMS"]))
+    return jobs, queued, failed
+
+
+def save_results(results, queued):
+    """
+    Store extracted terms. A document queued again while it was being
+    extracted keeps its PENDING row for the next run.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for document_id, terms, error, unsupported in results:
+            if unsupported:
+                status = IndexStatus.UNSUPPORTED
+            elif error:
+                status = IndexStatus.FAILED
+            else:
+                status = IndexStatus.INDEXED
+            DocumentIndex.objects.filter(
+                pk=document_id, queued_at=queued[document_id]
+            ).update(status=status.name, terms=terms, error=error, indexed_at=now)
+
+
+def search_documents(project_id, query):
+    """Documents of a project whose file contains every word of `query`"""
+    terms = terms_of([query], get_config()["MAX_TERMS"])
+    if not terms:
+        return Document.objects.none()
+    return Document.objects.filter(
+        project_id=project_id, search_index__terms__contains=terms
+    )
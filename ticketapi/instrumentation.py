@@ -0,0 +1,146 @@
+import random
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import CollectorRegistry, Histogram
+from rest_framework import serializers
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_SECONDS = Histogram(
+    "ticketapi_request_seconds",
+    "Total time spent handling a request.",
+    ["view"],
+    buckets=TIME_BUCKETS,
+    registry=REGISTRY,
+)
+DB_SECONDS = Histogram(
+    "ticketapi_db_seconds",
+    "Time spent executing database queries per request.",
+    ["view"],
+    buckets=TIME_BUCKETS,
+    registry=REGISTRY,
+)
+DB_QUERIES = Histogram(
+    "ticketapi_db_queries",
+    "Number of database queries executed per request.",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+    registry=REGISTRY,
+)
+SERIALIZER_SECONDS = Histogram(
+    "ticketapi_serializer_seconds",
+    "Time spent serializing response data per request.",
+    ["view"],
+    buckets=TIME_BUCKETS,
+    registry=REGISTRY,
+)
+RESPONSE_BYTES = Histogram(
+    "ticketapi_response_bytes",
+    "Size of the response body in bytes.",
+    ["view"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    registry=REGISTRY,
+)
+
+_current_stats = ContextVar("request_stats", default=None)
+
+
+def get_config():
+    config = {
+        "SAMPLE_RATE": 1.0,
+        "SERVER_TIMING": True,
+        "METRICS_TOKEN": None,
+        "PUBLIC_METRICS": False,
+    }
+    config.update(getattr(settings, "PERF_INSTRUMENTATION", {}))
+    return config
+
+
+class RequestStats:
+    __slots__ = ("db_time", "db_queries", "serializer_time", "serializer_depth")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.db_queries += 1
+
+
+class PerformanceMiddleware:
+    """
+    Record total, DB and serializer time, query count and response size
+    for a sample of requests, labelled by URL name.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        if config["SAMPLE_RATE"] < 1.0 and random.random() >= config["SAMPLE_RATE"]:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        total = perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        REQUEST_SECONDS.labels(view).observe(total)
+        DB_SECONDS.labels(view).observe(stats.db_time)
+        DB_QUERIES.labels(view).observe(stats.db_queries)
+        SERIALIZER_SECONDS.labels(view).observe(stats.serializer_time)
+        if not response.streaming:
+            RESPONSE_BYTES.labels(view).observe(len(response.content))
+
+        if config["SERVER_TIMING"]:
+            response["Server-Timing"] = (
+                f"total;dur={total * 1000:.2f}, "
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_queries} queries", '
+                f"ser;dur={stats.serializer_time * 1000:.2f}"
+            )
+        return response
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that adds its representation time to the current
+    request stats. Nested serializers are counted once, by the outermost.
+    """
+
+    def to_representation(self, instance):
+        stats = _current_stats.get()
+        if stats is None or stats.serializer_depth:
+            return super().to_representation(instance)
+
+        stats.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += perf_counter() - start
+            stats.serializer_depth -= 1
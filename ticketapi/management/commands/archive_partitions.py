@@ -0,0 +1,82 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ticketapi.partitions import (
+    PARTITION_COLUMNS,
+    add_months,
+    archive_rows,
+    drop_partition,
+    ensure_partitions,
+    is_partitioned,
+    month_partitions,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming TimeLine/Notification partitions, export rows older than "
+        "the retention window to gzipped JSONL and drop their partitions."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.PARTITION_RETENTION_MONTHS,
+        )
+        parser.add_argument("--output-dir", default=settings.ARCHIVE_ROOT)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--months-ahead", type=int, default=3)
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Drop expired rows without exporting them first.",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = Path(options["output_dir"])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        cutoff = add_months(month_start(timezone.now()), -options["retention_months"])
+
+        for model, column in PARTITION_COLUMNS.items():
+            table = model._meta.db_table
+            if is_partitioned(model):
+                for name in ensure_partitions(model, options["months_ahead"]):
+                    self.stdout.write(f"Created partition {name}")
+
+                for month, name in sorted(month_partitions(model).items()):
+                    if add_months(month, 1) > cutoff:
+                        continue
+                    if not options["no_archive"]:
+                        rows = model.objects.filter(
+                            **{
+                                f"{column}__gte": month,
+                                f"{column}__lt": add_months(month, 1),
+                            }
+                        )
+                        count = archive_rows(
+                            rows, output_dir / f"{name}.jsonl.gz", options["batch_size"]
+                        )
+                        self.stdout.write(f"Archived {count} rows from {name}")
+                    drop_partition(name)
+                    self.stdout.write(f"Dropped partition {name}")
+
+            # Whatever is left: rows in the default partition, or every
+            # expired row when the table is not partitioned.
+            expired = model.objects.filter(**{f"{column}__lt": cutoff})
+            if options["no_archive"]:
+                count, _ = expired.delete()
+            else:
+                count = archive_rows(
+                    expired,
+                    output_dir / f"{table}_before_{cutoff:%Y%m}.jsonl.gz",
+                    options["batch_size"],
+                    delete=True,
+                )
+            if count:
+                self.stdout.write(f"Archived {count} expired rows from {table}")
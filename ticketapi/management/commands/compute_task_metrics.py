@@ -0,0 +1,79 @@
+from itertools import islice
+from time import perf_counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast, Coalesce, Extract
+from django.utils import timezone
+
+from ticketapi.metrics import COLUMNS, TaskMetricsAccumulator
+from ticketapi.models import TaskMetric, TaskTransition
+
+DTYPES = {
+    "project": np.int64,
+    "task": np.int64,
+    "status": np.int8,
+    "at": np.float64,
+    "assignee": np.int64,
+}
+
+
+def transition_chunks(chunk_size):
+    """Status transitions ordered by task and time, as column arrays"""
+    rows = (
+        TaskTransition.objects.filter(task__deleted_at__isnull=True)
+        .order_by("task_id", "changed_at", "id")
+        .values_list(
+            "task__project_id",
+            "task_id",
+            "to_status",
+            Cast(Extract("changed_at", "epoch"), FloatField()),
+            Coalesce("task__assignee_id", 0),
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            return
+        table = np.array(batch, dtype=np.float64)
+        yield {
+            name: table[:, index].astype(DTYPES[name])
+            for index, name in enumerate(COLUMNS)
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute lead time, time in status and weekly throughput per project "
+        "from the task transition history and replace the TaskMetric table."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        accumulator = TaskMetricsAccumulator()
+        transitions = 0
+        for chunk in transition_chunks(options["chunk_size"]):
+            accumulator.add(chunk)
+            transitions += len(chunk["task"])
+
+        computed_at = timezone.now()
+        metrics = [
+            TaskMetric(computed_at=computed_at, **row) for row in accumulator.results()
+        ]
+        with transaction.atomic():
+            TaskMetric.objects.all().delete()
+            TaskMetric.objects.bulk_create(metrics, batch_size=1000)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Computed {len(metrics)} metrics from {transitions} transitions "
+                f"in {perf_counter() - started:.1f}s."
+            )
+        )
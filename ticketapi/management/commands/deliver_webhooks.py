@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ticketapi.webhooks import WebhookSender, deliver_pending, get_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued webhook deliveries in batches per subscription, retrying "
+        "failures with exponential backoff. Runs until interrupted unless "
+        "--once is given."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--concurrency", type=int)
+        parser.add_argument(
+            "--once", action="store_true", help="Stop when nothing is due."
+        )
+
+    def handle(self, *args, **options):
+        config = get_config()
+        if options["batch_size"]:
+            config["BATCH_SIZE"] = options["batch_size"]
+        if options["concurrency"]:
+            config["CONCURRENCY"] = options["concurrency"]
+
+        total_delivered = total_failed = 0
+        with WebhookSender(config) as sender:
+            try:
+                while True:
+                    delivered, failed = deliver_pending(sender, config)
+                    total_delivered += delivered
+                    total_failed += failed
+                    if delivered or failed:
+                        continue
+                    if options["once"]:
+                        break
+                    time.sleep(config["POLL_SECONDS"])
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Delivered {total_delivered} webhook events, "
+                f"{total_failed} failed attempts."
+            )
+        )
@@ -0,0 +1,221 @@
+import json
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.fields import SkipField, empty
+from rest_framework.serializers import ValidationError
+
+from ticketapi.enums import EventTarget, EventType
+from ticketapi.membership import Membership, invalidate_visible_projects
+from ticketapi.models import Comments, Project, Task, TimeLine
+from ticketapi.serializers import CommentsSerializer, ProjectSerializer, TaskSerializer
+
+User = get_user_model()
+
+# Serializer whose field rules validate each record type, and the fields used.
+RECORD_FIELDS = {
+    "project": (ProjectSerializer, ["title", "description", "start_date", "end_date"]),
+    "task": (TaskSerializer, ["title", "description", "status"]),
+    "comment": (CommentsSerializer, ["text"]),
+}
+
+
+class UnresolvedReference(Exception):
+    """A record names a row that is missing or was not imported"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Import projects, tasks and comments from a JSONL file. Records are "
+        "validated and bulk-inserted in batches without firing model signals; "
+        "timeline events are added in one pass at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL file, projects before their tasks")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.fields = {
+            record_type: {name: serializer_class().fields[name] for name in field_names}
+            for record_type, (serializer_class, field_names) in RECORD_FIELDS.items()
+        }
+        self.user_ids = dict(User.objects.values_list("email", "id"))
+        self.project_ids = {}
+        self.task_ids = {}
+        self.task_projects = {}
+        self.member_ids = set()
+        self.counts = {"project": 0, "task": 0, "comment": 0}
+        self.errors = 0
+        self.started = perf_counter()
+
+        try:
+            source = open(options["path"], encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+
+        batch_type, batch = None, []
+        with source:
+            for line_number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    self.report_error(line_number, f"invalid JSON ({exc})")
+                    continue
+                record_type = record.get("type")
+                if record_type not in RECORD_FIELDS:
+                    self.report_error(line_number, f"unknown type {record_type!r}")
+                    continue
+
+                if batch and (
+                    record_type != batch_type or len(batch) >= self.batch_size
+                ):
+                    self.flush(batch_type, batch)
+                    batch = []
+                batch_type = record_type
+                batch.append((line_number, record))
+        if batch:
+            self.flush(batch_type, batch)
+
+        self.create_timeline()
+        # Memberships were bulk-created, so no m2m_changed receiver saw them.
+        invalidate_visible_projects(self.member_ids)
+        elapsed = perf_counter() - self.started
+        total = sum(self.counts.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.counts['project']} projects, {self.counts['task']} "
+                f"tasks and {self.counts['comment']} comments in {elapsed:.1f}s "
+                f"({total / max(elapsed, 1e-9):.0f} rows/s), {self.errors} errors."
+            )
+        )
+
+    def report_error(self, line_number, message):
+        self.errors += 1
+        self.stderr.write(f"Line {line_number}: {message}")
+
+    def validate(self, record_type, line_number, record):
+        data, errors = {}, {}
+        for name, field in self.fields[record_type].items():
+            try:
+                data[name] = field.run_validation(record.get(name, empty))
+            except SkipField:
+                continue
+            except ValidationError as exc:
+                errors[name] = exc.detail
+        if errors:
+            self.report_error(line_number, json.dumps(errors))
+            return None
+        return data
+
+    def resolve(self, ids, key, line_number, label, required=True):
+        if key is None:
+            if not required:
+                return None
+            self.report_error(line_number, f"missing {label}")
+            raise UnresolvedReference(label)
+        if key not in ids:
+            self.report_error(line_number, f"unknown {label} {key!r}")
+            raise UnresolvedReference(key)
+        return ids[key]
+
+    def flush(self, record_type, batch):
+        objects, source_ids, members = [], [], []
+        for line_number, record in batch:
+            data = self.validate(record_type, line_number, record)
+            if data is None:
+                continue
+            try:
+                if record_type == "project":
+                    members.append(
+                        [
+                            self.resolve(self.user_ids, email, line_number, "user")
+                            for email in record.get("team_members", [])
+                        ]
+                    )
+                    objects.append(Project(**data))
+                elif record_type == "task":
+                    objects.append(
+                        Task(
+                            project_id=self.resolve(
+                                self.project_ids,
+                                record.get("project"),
+                                line_number,
+                                "project",
+                            ),
+                            assignee_id=self.resolve(
+                                self.user_ids,
+                                record.get("assignee"),
+                                line_number,
+                                "user",
+                                required=False,
+                            ),
+                            **data,
+                        )
+                    )
+                else:
+                    task_id = self.resolve(
+                        self.task_ids, record.get("task"), line_number, "task"
+                    )
+                    objects.append(
+                        Comments(
+                            task_id=task_id,
+                            project_id=self.task_projects[task_id],
+                            author_id=self.resolve(
+                                self.user_ids,
+                                record.get("author"),
+                                line_number,
+                                "author",
+                            ),
+                            **data,
+                        )
+                    )
+            except UnresolvedReference:
+                continue
+            source_ids.append(record.get("id"))
+
+        with transaction.atomic():
+            created = type(objects[0]).objects.bulk_create(objects) if objects else []
+            if record_type == "project":
+                Membership.objects.bulk_create(
+                    Membership(project_id=project.id, customuser_id=user_id)
+                    for project, user_ids in zip(created, members)
+                    for user_id in user_ids
+                )
+                self.member_ids.update(user_id for ids in members for user_id in ids)
+                self.project_ids.update(zip(source_ids, (p.id for p in created)))
+            elif record_type == "task":
+                self.task_ids.update(zip(source_ids, (t.id for t in created)))
+                self.task_projects.update((t.id, t.project_id) for t in created)
+
+        self.counts[record_type] += len(created)
+        elapsed = perf_counter() - self.started
+        self.stdout.write(
+            f"{record_type}: {self.counts[record_type]} imported "
+            f"({sum(self.counts.values()) / max(elapsed, 1e-9):.0f} rows/s)"
+        )
+
+    def create_timeline(self):
+        events = [
+            TimeLine(
+                project_id=project_id,
+                event_type=EventType.CREATED.value,
+                target_type=EventTarget.PROJECT.name,
+                target_id=project_id,
+            )
+            for project_id in self.project_ids.values()
+        ] + [
+            TimeLine(
+                project_id=self.task_projects[task_id],
+                event_type=EventType.CREATED.value,
+                target_type=EventTarget.TASK.name,
+                target_id=task_id,
+            )
+            for task_id in self.task_ids.values()
+        ]
+        TimeLine.objects.bulk_create(events, batch_size=self.batch_size)
@@ -0,0 +1,54 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ticketapi.extraction import extract_document
+from ticketapi.indexing import claim_batch, get_config, save_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract the text of queued documents in a process pool and store "
+        "their normalized terms for search. Runs until interrupted unless "
+        "--once is given."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--once", action="store_true", help="Stop when nothing is queued."
+        )
+
+    def handle(self, *args, **options):
+        config = get_config()
+        if options["workers"]:
+            config["WORKERS"] = options["workers"]
+        if options["batch_size"]:
+            config["BATCH_SIZE"] = options["batch_size"]
+
+        indexed = 0
+        # Workers only read files; spawning keeps them clear of the parent's
+        # database connections.
+        with ProcessPoolExecutor(
+            max_workers=config["WORKERS"],
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            try:
+                while True:
+                    jobs, queued, failed = claim_batch(config)
+                    if queued:
+                        results = list(pool.map(extract_document, jobs)) + failed
+                        save_results(results, queued)
+                        indexed += len(results)
+                        continue
+                    if options["once"]:
+                        break
+                    time.sleep(config["POLL_SECONDS"])
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} documents."))
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ticketapi.models import Project, Task
+from ticketapi.purge import purge_project, purge_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove soft-deleted projects and tasks with their comments, "
+        "documents, stored files and timeline events, in bounded batches."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=0,
+            metavar="SECONDS",
+            help="Only purge rows deleted at least this long ago.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        cutoff = timezone.now() - timedelta(seconds=options["older_than"])
+
+        project_ids = list(
+            Project.all_objects.filter(deleted_at__lte=cutoff).values_list(
+                "pk", flat=True
+            )
+        )
+        for project_id in project_ids:
+            purge_project(project_id, batch_size)
+            self.stdout.write(f"Purged project {project_id}.")
+
+        tasks = purge_tasks(Task.all_objects.filter(deleted_at__lte=cutoff), batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {len(project_ids)} projects and {tasks} other tasks."
+            )
+        )
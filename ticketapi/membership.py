@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Project
+
+Membership = Project.team_members.through
+
+
+def cache_key(user_id):
+    return f"visible-projects:{user_id}"
+
+
+def members_cache_key(project_id):
+    return f"project-members:{project_id}"
+
+
+def cache_seconds():
+    return getattr(settings, "MEMBERSHIP_CACHE_SECONDS", 300)
+
+
+def visible_project_ids(user):
+    """
+    Ids of the projects `user` is a team member of, leaving out deleted
+    ones. Filtering on this set with `project_id__in` replaces a join
+    through the membership table.
+    """
+    key = cache_key(user.pk)
+    project_ids = cache.get(key)
+    if project_ids is None:
+        project_ids = frozenset(
+            Membership.objects.filter(
+                customuser_id=user.pk, project__deleted_at__isnull=True
+            ).values_list("project_id", flat=True)
+        )
+        cache.set(key, project_ids, cache_seconds())
+    return project_ids
+
+
+def project_member_lists(project_ids):
+    """
+    `{project id: [member user ids]}` in the order members were added. The
+    lists are cached per project and rebuilt after membership changes, so
+    rendering members never loads CustomUser rows.
+    """
+    keys = {members_cache_key(project_id): project_id for project_id in project_ids}
+    lists = {keys[key]: ids for key, ids in cache.get_many(keys).items()}
+    missing = set(project_ids) - lists.keys()
+    if missing:
+        loaded = {project_id: [] for project_id in missing}
+        rows = (
+            Membership.objects.filter(project_id__in=missing)
+            .order_by("pk")
+            .values_list("project_id", "customuser_id")
+        )
+        for project_id, user_id in rows:
+            loaded[project_id].append(user_id)
+        cache.set_many(
+            {members_cache_key(project_id): ids for project_id, ids in loaded.items()},
+            cache_seconds(),
+        )
+        lists.update(loaded)
+    return lists
+
+
+def project_member_ids(project_ids):
+    return set(
+        Membership.objects.filter(project_id__in=project_ids).values_list(
+            "customuser_id", flat=True
+        )
+    )
+
+
+def invalidate_visible_projects(user_ids):
+    """
+    Drop the cached visible project ids of `user_ids` once the transaction
+    commits. Any earlier, a concurrent request could cache the old set again.
+    """
+    keys = [cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_member_lists(project_ids):
+    """Drop the cached member lists of `project_ids` once the transaction commits"""
+    keys = [members_cache_key(project_id) for project_id in project_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,171 @@
+import datetime
+
+import numpy as np
+
+from .enums import MetricKind, TaskStatus
+from .models import STATUS_CODES
+
+PERCENTILES = (50, 85, 95)
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+# Bucket edges in seconds for the stored duration histograms.
+HISTOGRAM_EDGES = np.array(
+    [0, HOUR, 4 * HOUR, DAY, 2 * DAY, 4 * DAY, WEEK, 2 * WEEK, 4 * WEEK, np.inf]
+)
+# 1970-01-05 was a Monday; weeks are counted from there.
+WEEK_ORIGIN = 4 * DAY
+CLOSED = STATUS_CODES[TaskStatus.CLOSED.name]
+
+COLUMNS = ("project", "task", "status", "at", "assignee")
+
+
+def summarize(seconds):
+    """Count, percentiles and histogram of an array of durations"""
+    return {
+        "count": len(seconds),
+        **dict(
+            zip(
+                (f"p{p}" for p in PERCENTILES),
+                np.percentile(seconds, PERCENTILES).tolist(),
+            )
+        ),
+        "histogram": np.histogram(seconds, HISTOGRAM_EDGES)[0].tolist(),
+    }
+
+
+def groups(keys, values):
+    """Split `values` by the distinct rows of the `keys` columns"""
+    if not len(values):
+        return
+    order = np.lexsort(keys[::-1])
+    keys = [key[order] for key in keys]
+    values = values[order]
+    change = np.zeros(len(values), dtype=bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    bounds = np.append(np.flatnonzero(change), len(values))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        yield tuple(key[start].item() for key in keys), values[start:end]
+
+
+class TaskMetricsAccumulator:
+    """
+    Lead time, time spent in each status and weekly throughput computed
+    chunk by chunk from status transitions sorted by task and time.
+
+    Each chunk is a dict of equally long column arrays named by COLUMNS,
+    with `at` in epoch seconds and `assignee` 0 for unassigned tasks. A
+    task's history may be split across chunks: the rows of the last task
+    in a chunk are held back until the next one.
+    """
+
+    def __init__(self):
+        self.carry = None
+        self.cycle = []
+        self.lead = []
+        self.closed = []
+
+    def add(self, chunk):
+        if self.carry is not None:
+            chunk = {
+                name: np.concatenate([self.carry[name], chunk[name]])
+                for name in COLUMNS
+            }
+        task = chunk["task"]
+        if not len(task):
+            return
+        split = np.searchsorted(task, task[-1])
+        self.carry = {name: column[split:] for name, column in chunk.items()}
+        self.process({name: column[:split] for name, column in chunk.items()})
+
+    def finish(self):
+        if self.carry is not None:
+            self.process(self.carry)
+            self.carry = None
+
+    def process(self, chunk):
+        project, task, status, at, assignee = (chunk[name] for name in COLUMNS)
+        if not len(task):
+            return
+
+        # Time in a status runs until the task's next transition.
+        same_task = task[1:] == task[:-1]
+        self.cycle.append(
+            (
+                project[:-1][same_task],
+                status[:-1][same_task],
+                (at[1:] - at[:-1])[same_task],
+            )
+        )
+
+        # Lead time runs from a task's first transition to its first close.
+        first_rows = np.flatnonzero(np.r_[True, ~same_task])
+        closed_rows = np.flatnonzero(status == CLOSED)
+        _, first_close = np.unique(task[closed_rows], return_index=True)
+        first_closed = closed_rows[first_close]
+        started = first_rows[np.searchsorted(task[first_rows], task[first_closed])]
+        self.lead.append((project[first_closed], at[first_closed] - at[started]))
+
+        self.closed.append(
+            (
+                project[closed_rows],
+                (at[closed_rows] - WEEK_ORIGIN) // WEEK,
+                assignee[closed_rows],
+            )
+        )
+
+    def results(self):
+        """TaskMetric field values for every computed metric"""
+        self.finish()
+        rows = []
+
+        if self.lead:
+            project, seconds = (np.concatenate(column) for column in zip(*self.lead))
+            for (project_id,), values in groups([project], seconds):
+                rows.append(
+                    {
+                        "kind": MetricKind.LEAD_TIME.name,
+                        "project_id": project_id,
+                        **summarize(values),
+                    }
+                )
+
+        if self.cycle:
+            project, status, seconds = (
+                np.concatenate(column) for column in zip(*self.cycle)
+            )
+            for (project_id, code), values in groups([project, status], seconds):
+                rows.append(
+                    {
+                        "kind": MetricKind.CYCLE_TIME.name,
+                        "project_id": project_id,
+                        "status": code,
+                        **summarize(values),
+                    }
+                )
+
+        if self.closed:
+            closed = np.stack(
+                [np.concatenate(column) for column in zip(*self.closed)], axis=1
+            ).astype(np.int64)
+            if len(closed):
+                keys, counts = np.unique(closed, axis=0, return_counts=True)
+                for (project_id, week, assignee_id), count in zip(
+                    keys.tolist(), counts.tolist()
+                ):
+                    rows.append(
+                        {
+                            "kind": MetricKind.THROUGHPUT.name,
+                            "project_id": project_id,
+                            "week": week_start(week),
+                            "assignee_id": assignee_id or None,
+                            "count": count,
+                        }
+                    )
+        return rows
+
+
+def week_start(week):
+    return datetime.date(1970, 1, 5) + datetime.timedelta(weeks=week)
@@ -0,0 +1,122 @@
+# Converts the append-only TimeLine and Notification tables to monthly range
+# partitions on PostgreSQL. Other databases keep plain tables.
+
+import datetime
+
+from django.db import migrations
+
+PARTITIONED_TABLES = [
+    ("ticketapi_timeline", "time", "project_id", "ticketapi_project"),
+    ("ticketapi_notification", "created_at", "user_id", "api_customuser"),
+]
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    today = datetime.datetime.now(datetime.timezone.utc)
+    this_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for table, column, fk_column, fk_table in PARTITIONED_TABLES:
+        old = f"{table}_unpartitioned"
+        schema_editor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+        schema_editor.execute(
+            f'ALTER TABLE "{old}" ALTER COLUMN "id" DROP IDENTITY IF EXISTS'
+        )
+        schema_editor.execute(f'ALTER TABLE "{old}" ALTER COLUMN "id" DROP DEFAULT')
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS "{table}_id_seq"')
+        schema_editor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("{column}")'
+        )
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "{column}")'
+        )
+        schema_editor.execute(
+            f'CREATE SEQUENCE "{table}_id_seq" OWNED BY "{table}"."id"'
+        )
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ALTER COLUMN "id" '
+            f"SET DEFAULT nextval('{table}_id_seq')"
+        )
+        schema_editor.execute(
+            f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'
+        )
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN("{column}") FROM "{old}"')
+            oldest = cursor.fetchone()[0] or this_month
+        month = oldest.astimezone(datetime.timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        while month <= add_months(this_month, MONTHS_AHEAD):
+            schema_editor.execute(
+                f'CREATE TABLE "{table}_{month:%Y%m}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [month, add_months(month, 1)],
+            )
+            month = add_months(month, 1)
+
+        schema_editor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+        schema_editor.execute(
+            f"SELECT setval('{table}_id_seq', COALESCE(MAX(\"id\"), 0) + 1, false) "
+            f'FROM "{table}"'
+        )
+        schema_editor.execute(f'DROP TABLE "{old}"')
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{fk_column}_fk" '
+            f'FOREIGN KEY ("{fk_column}") REFERENCES "{fk_table}" ("id") '
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        schema_editor.execute(
+            f'CREATE INDEX "{table}_{fk_column}_idx" ON "{table}" ("{fk_column}")'
+        )
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, column, fk_column, fk_table in PARTITIONED_TABLES:
+        flat = f"{table}_flat"
+        schema_editor.execute(
+            f'CREATE TABLE "{flat}" (LIKE "{table}" INCLUDING DEFAULTS)'
+        )
+        schema_editor.execute(f'ALTER TABLE "{flat}" ALTER COLUMN "id" DROP DEFAULT')
+        schema_editor.execute(f'ALTER TABLE "{flat}" ADD PRIMARY KEY ("id")')
+        schema_editor.execute(f'INSERT INTO "{flat}" SELECT * FROM "{table}"')
+        schema_editor.execute(f'DROP TABLE "{table}" CASCADE')
+        schema_editor.execute(f'ALTER TABLE "{flat}" RENAME TO "{table}"')
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ALTER COLUMN "id" '
+            f"ADD GENERATED BY DEFAULT AS IDENTITY"
+        )
+        schema_editor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f'COALESCE(MAX("id"), 0) + 1, false) FROM "{table}"'
+        )
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{fk_column}_fk" '
+            f'FOREIGN KEY ("{fk_column}") REFERENCES "{fk_table}" ("id") '
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        schema_editor.execute(
+            f'CREATE INDEX "{table}_{fk_column}_idx" ON "{table}" ("{fk_column}")'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0004_alter_profile_phone_alter_profile_role_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:32
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0005_partition_timeline_notification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timeline",
+            name="changes",
+            field=models.JSONField(
+                blank=True,
+                encoder=django.core.serializers.json.DjangoJSONEncoder,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="timeline",
+            name="target_id",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="timeline",
+            name="target_type",
+            field=models.CharField(
+                blank=True,
+                choices=[("PROJECT", "project"), ("TASK", "task")],
+                default="",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:45
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def repair_comment_projects(apps, schema_editor):
+    """Point every comment at its task's project."""
+    Comments = apps.get_model("ticketapi", "Comments")
+    Task = apps.get_model("ticketapi", "Task")
+    Comments.objects.exclude(project_id=F("task__project_id")).update(
+        project_id=Subquery(
+            Task.objects.filter(pk=OuterRef("task_id")).values("project_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0008_project_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_comment_projects, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comments",
+            index=models.Index(
+                fields=["project", "task", "created_at"],
+                name="comment_project_task_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_statuses(apps, schema_editor):
+    """Store every status by name; the old default stored the value."""
+    Task = apps.get_model("ticketapi", "Task")
+    for name, value in Task._meta.get_field("status").choices:
+        Task.objects.filter(status__iexact=value).exclude(status=name).update(
+            status=name
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0009_comment_project_from_task"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="task",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("OPEN", "open"),
+                    ("WORKING", "working"),
+                    ("REVIEW", "review"),
+                    ("WAITING_QA", "waiting_qa"),
+                    ("AWAITING_RELEASE", "awaiting_release"),
+                    ("CLOSED", "closed"),
+                ],
+                default="OPEN",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="TaskTransition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "from_status",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        choices=[
+                            (0, "OPEN"),
+                            (1, "WORKING"),
+                            (2, "REVIEW"),
+                            (3, "WAITING_QA"),
+                            (4, "AWAITING_RELEASE"),
+                            (5, "CLOSED"),
+                        ],
+                        null=True,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "OPEN"),
+                            (1, "WORKING"),
+                            (2, "REVIEW"),
+                            (3, "WAITING_QA"),
+                            (4, "AWAITING_RELEASE"),
+                            (5, "CLOSED"),
+                        ]
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions",
+                        to="ticketapi.task",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["task", "changed_at"], name="transition_task_time_idx"
+                    ),
+                    models.Index(fields=["changed_at"], name="transition_time_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0010_task_workflow"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskMetric",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("LEAD_TIME", "lead_time"),
+                            ("CYCLE_TIME", "cycle_time"),
+                            ("THROUGHPUT", "throughput"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "status",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        choices=[
+                            (0, "OPEN"),
+                            (1, "WORKING"),
+                            (2, "REVIEW"),
+                            (3, "WAITING_QA"),
+                            (4, "AWAITING_RELEASE"),
+                            (5, "CLOSED"),
+                        ],
+                        null=True,
+                    ),
+                ),
+                ("week", models.DateField(blank=True, null=True)),
+                ("count", models.PositiveIntegerField()),
+                ("p50", models.FloatField(blank=True, null=True)),
+                ("p85", models.FloatField(blank=True, null=True)),
+                ("p95", models.FloatField(blank=True, null=True)),
+                ("histogram", models.JSONField(blank=True, null=True)),
+                ("computed_at", models.DateTimeField()),
+                (
+                    "assignee",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_metrics",
+                        to="ticketapi.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["project", "kind"], name="task_metric_project_idx"
+                    )
+                ],
+            },
+        ),
+    ]
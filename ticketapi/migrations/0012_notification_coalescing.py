@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def classify_comment_notifications(apps, schema_editor):
+    Notification = apps.get_model("ticketapi", "Notification")
+    Notification.objects.filter(text__startswith="New comment on task").update(
+        kind="COMMENT"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0011_task_metrics"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="kind",
+            field=models.CharField(
+                choices=[("ASSIGNED", "assigned"), ("COMMENT", "comment")],
+                default="ASSIGNED",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="task",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="ticketapi.task",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(classify_comment_notifications, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "kind", "task", "created_at"],
+                name="notification_coalesce_idx",
+            ),
+        ),
+    ]
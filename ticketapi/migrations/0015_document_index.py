@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:42
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def queue_existing_documents(apps, schema_editor):
+    Document = apps.get_model("ticketapi", "Document")
+    DocumentIndex = apps.get_model("ticketapi", "DocumentIndex")
+    document_ids = Document.objects.values_list("pk", flat=True).iterator()
+    DocumentIndex.objects.bulk_create(
+        (DocumentIndex(document_id=document_id) for document_id in document_ids),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0014_soft_delete"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentIndex",
+            fields=[
+                (
+                    "document",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="ticketapi.document",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "pending"),
+                            ("INDEXED", "indexed"),
+                            ("UNSUPPORTED", "unsupported"),
+                            ("FAILED", "failed"),
+                        ],
+                        default="PENDING",
+                        max_length=12,
+                    ),
+                ),
+                (
+                    "terms",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=64),
+                        blank=True,
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                ("error", models.TextField(blank=True, default="")),
+                ("queued_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("attempted_at", models.DateTimeField(blank=True, null=True)),
+                ("indexed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["terms"], name="document_terms_idx"
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "PENDING")),
+                        fields=["queued_at"],
+                        name="document_index_pending_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(queue_existing_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:15
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def hide_comments_of_deleted_tasks(apps, schema_editor):
+    Comments = apps.get_model("ticketapi", "Comments")
+    Task = apps.get_model("ticketapi", "Task")
+    Comments.objects.filter(task__deleted_at__isnull=False).update(
+        deleted_at=Subquery(
+            Task.objects.filter(pk=OuterRef("task_id")).values("deleted_at")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0016_project_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comments",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(hide_comments_of_deleted_tasks, migrations.RunPython.noop),
+    ]
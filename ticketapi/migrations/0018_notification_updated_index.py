@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketapi", "0017_comment_deleted_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-updated_at"], name="notification_user_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has been modified since it was last fetched."
+    default_code = "precondition_failed"
+
+
+class AtomicWriteMixin:
+    """
+    Run create, update and destroy in one transaction, so that the rows
+    written by signal receivers (timeline events, webhook deliveries, ...)
+    commit or roll back together with the change.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+def object_validators(pk, updated_at):
+    """ETag and Last-Modified timestamp of an object version"""
+    etag = f'"{pk}-{int(updated_at.timestamp() * 1_000_000)}"'
+    return etag, int(updated_at.timestamp())
+
+
+class ConditionalObjectMixin:
+    """
+    ETag/Last-Modified for detail views, derived from the object's id and
+    `updated_at`. Revalidating with GET costs one indexed lookup and no
+    serialization; If-Match/If-Unmodified-Since guard PUT, PATCH and DELETE.
+    A GET without conditional headers takes the validators from the object
+    it loads anyway.
+
+    The object permissions are checked before a 304 is sent, on an instance
+    with only `pk`, `updated_at` and the `version_fields` they read loaded.
+    """
+
+    conditional_validators = None
+    version_fields = ()
+
+    def object_version(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return (
+            self.filter_queryset(self.get_queryset())
+            .select_related(None)
+            .prefetch_related(None)
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .only("pk", "updated_at", *self.version_fields)
+            .first()
+        )
+
+    def get(self, request, *args, **kwargs):
+        conditional = (
+            "HTTP_IF_NONE_MATCH" in request.META
+            or "HTTP_IF_MODIFIED_SINCE" in request.META
+        )
+        version = self.object_version() if conditional else None
+        if version is not None:
+            self.check_object_permissions(request, version)
+            self.conditional_validators = object_validators(
+                version.pk, version.updated_at
+            )
+            etag, last_modified = self.conditional_validators
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                return response
+        return super().get(request, *args, **kwargs)
+
+    def get_object(self):
+        obj = super().get_object()
+        etag, last_modified = object_validators(obj.pk, obj.updated_at)
+        if self.request.method in SAFE_METHODS:
+            self.conditional_validators = etag, last_modified
+        elif get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        ):
+            raise PreconditionFailed()
+        return obj
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.conditional_validators = object_validators(
+            serializer.instance.pk, serializer.instance.updated_at
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.conditional_validators and (
+            200 <= response.status_code < 300
+            or response.status_code == status.HTTP_304_NOT_MODIFIED
+        ):
+            etag, last_modified = self.conditional_validators
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -1,8 +1,23 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.dispatch import Signal
+from django.utils import timezone
 
 from api.models import CustomUser
 
-from .enums import EventType, RoleChoice, TaskStatus
+from .enums import (
+    EventTarget,
+    EventType,
+    IndexStatus,
+    MetricKind,
+    NotificationKind,
+    RoleChoice,
+    SyncModel,
+    TaskStatus,
+    WebhookStatus,
+)
 from .validators import validate_phone
 
 # Create your models here.
@@ -26,21 +41,147 @@ class Profile(models.Model):
         return f"{self.user} - {self.role}"
 
 
-class Project(models.Model):
+class DirtyFieldsMixin:
+    """
+    Remembers the column values an instance was loaded with, so that save()
+    can tell which fields changed without reading the row again.
+
+    A save that changes nothing is skipped along with its signals. Otherwise
+    `saved_changes` maps the attname of each changed field to
+    `[old, new]` for post_save receivers; it is None for inserts and for
+    instances that were not loaded from the database.
+    """
+
+    saved_changes = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def snapshot_fields(self, attnames=None):
+        """Take the current values of `attnames` (default all loaded) as saved"""
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for field in self._meta.concrete_fields:
+            if attnames is None or field.attname in attnames:
+                if field.attname in self.__dict__:
+                    loaded[field.attname] = getattr(self, field.attname)
+
+    def dirty_fields(self, update_fields=None):
+        """
+        `{attname: [old, new]}` for set fields whose value differs from the
+        loaded one, or None when there is nothing to compare against.
+
+        Fields assigned without having been loaded (deferred by only() or
+        defer()) have their old values read in one query.
+        """
+        loaded = self.__dict__.get("_loaded_values")
+        if self._state.adding or not loaded:
+            return None
+        fields = [
+            field
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and not getattr(field, "auto_now", False)
+            and field.attname in self.__dict__
+            and (update_fields is None or {field.name, field.attname} & update_fields)
+        ]
+        unloaded = [field.attname for field in fields if field.attname not in loaded]
+        if unloaded:
+            row = (
+                type(self)
+                ._base_manager.using(self._state.db)
+                .filter(pk=self.pk)
+                .values(*unloaded)
+                .first()
+            )
+            if row is None:
+                return None
+            loaded.update(row)
+        changes = {}
+        for field in fields:
+            old = loaded[field.attname]
+            new = field.to_python(getattr(self, field.attname))
+            if old != new:
+                changes[field.attname] = [old, new]
+        return changes
+
+    def save(self, *args, update_fields=None, **kwargs):
+        changes = self.dirty_fields(
+            None if update_fields is None else set(update_fields)
+        )
+        if changes == {}:
+            return
+        self.saved_changes = changes
+        super().save(*args, update_fields=update_fields, **kwargs)
+        self.snapshot_fields(changes.keys() if changes else None)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self.snapshot_fields()
+        else:
+            attnames = {self._meta.get_field(name).attname for name in fields}
+            self.snapshot_fields(attnames)
+
+
+# Sent with `instance` after SoftDeleteModel.soft_delete() hides a row.
+soft_deleted = Signal()
+
+
+class LiveManager(models.Manager):
+    """Rows that have not been soft-deleted"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(DirtyFieldsMixin, models.Model):
+    """
+    Deleting sets `deleted_at`, which hides the row from `objects`, and
+    leaves removing it with its dependents to `manage.py purge_deleted`.
+    `all_objects` still sees deleted rows.
+    """
+
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(
+                fields=["deleted_at"],
+                name="%(class)s_deleted_idx",
+                condition=models.Q(deleted_at__isnull=False),
+            )
+        ]
+
+    def soft_delete(self):
+        self.deleted_at = timezone.now()
+        type(self).all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+        self.snapshot_fields({"deleted_at"})
+        soft_deleted.send(sender=type(self), instance=self)
+
+
+class Project(SoftDeleteModel):
     title = models.CharField(max_length=25)
     description = models.TextField()
     start_date = models.DateField()
     end_date = models.DateField(blank=True, null=True)
     team_members = models.ManyToManyField(CustomUser, related_name="projects")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 
-class Task(models.Model):
+class Task(SoftDeleteModel):
     title = models.CharField(max_length=30)
     description = models.TextField()
     status = models.CharField(
         max_length=20,
         choices=[(tag.name, tag.value) for tag in TaskStatus],
-        default=TaskStatus.OPEN.value,
+        default=TaskStatus.OPEN.name,
     )
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="tasks")
     assignee = models.ForeignKey(
@@ -50,32 +191,89 @@ class Task(models.Model):
         null=True,
         related_name="tasks",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.title
 
 
-class Document(models.Model):
+class Document(DirtyFieldsMixin, models.Model):
     name = models.CharField(max_length=20)
     description = models.CharField(max_length=30)
     file = models.FileField(upload_to="documents/")
     version = models.CharField(max_length=15, default="1.0")
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
 
+class DocumentIndex(models.Model):
+    """
+    Normalized terms of a document's file for per-project search. Saving a
+    document queues it here; `manage.py index_documents` extracts the text
+    outside the request.
+    """
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_index",
+    )
+    status = models.CharField(
+        max_length=12,
+        choices=[(tag.name, tag.value) for tag in IndexStatus],
+        default=IndexStatus.PENDING.name,
+    )
+    terms = ArrayField(models.CharField(max_length=64), default=list, blank=True)
+    error = models.TextField(blank=True, default="")
+    queued_at = models.DateTimeField(default=timezone.now)
+    attempted_at = models.DateTimeField(blank=True, null=True)
+    indexed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["terms"], name="document_terms_idx"),
+            models.Index(
+                fields=["queued_at"],
+                name="document_index_pending_idx",
+                condition=models.Q(status=IndexStatus.PENDING.name),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Index of {self.document_id} ({self.status})"
+
+
 class Comments(models.Model):
     text = models.TextField(max_length=300)
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="comments")
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Copied from the task when it is soft-deleted, so that comment queries
+    # can hide its comments without joining the task table.
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "task", "created_at"],
+                name="comment_project_task_idx",
+            )
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.task}"
 
+    def save(self, *args, **kwargs):
+        # Visibility filters go through `project`, so it always follows the task.
+        self.project_id = self.task.project_id
+        super().save(*args, **kwargs)
+
 
 class TimeLine(models.Model):
     event_type = models.CharField(
@@ -85,18 +283,227 @@ class TimeLine(models.Model):
     project = models.ForeignKey(
         Project, on_delete=models.CASCADE, related_name="timeline"
     )
+    target_type = models.CharField(
+        max_length=10,
+        choices=[(tag.name, tag.value) for tag in EventTarget],
+        blank=True,
+        default="",
+    )
+    target_id = models.PositiveBigIntegerField(blank=True, null=True)
+    # {"field": [old, new]} for the columns an update changed; long text
+    # fields are listed as {"field": null} without their contents.
+    changes = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
 
     def __str__(self):
         return f"{self.project.title} - {self.event_type} at {self.time}"
 
 
 class Notification(models.Model):
+    """
+    Repeated events of one kind are coalesced into a single unread row,
+    whose `count` says how many events it stands for.
+    """
+
     text = models.TextField()
     user = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name="notification"
     )
+    task = models.ForeignKey(
+        Task, on_delete=models.SET_NULL, blank=True, null=True, related_name="+"
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=[(tag.name, tag.value) for tag in NotificationKind],
+        default=NotificationKind.ASSIGNED.name,
+    )
+    count = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     mark_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "kind", "task", "created_at"],
+                name="notification_coalesce_idx",
+            ),
+            models.Index(
+                fields=["user", "-updated_at"], name="notification_user_updated_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.email} - {self.text[:20]}"
+
+
+class Tombstone(models.Model):
+    """
+    Deleted Task/Comment/Document, kept so that sync clients can drop it.
+    `project_id` is a plain column so tombstones outlive their project.
+    """
+
+    model = models.CharField(
+        max_length=10, choices=[(tag.name, tag.value) for tag in SyncModel]
+    )
+    object_id = models.PositiveBigIntegerField()
+    project_id = models.PositiveBigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+
+class ProjectTombstone(models.Model):
+    """
+    A project `user` can no longer see, because they left its team or it
+    was deleted, kept so that their sync clients drop its tasks, comments
+    and documents.
+    """
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="project_tombstones"
+    )
+    project_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "deleted_at"], name="project_tombstone_user_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"Project {self.project_id} gone for {self.user_id} at {self.deleted_at}"
+
+
+# Compact status codes stored on TaskTransition rows. New statuses must be
+# appended to TaskStatus so that existing codes keep their meaning.
+STATUS_CODES = {tag.name: code for code, tag in enumerate(TaskStatus)}
+
+
+class TaskTransition(models.Model):
+    """
+    One status change of a task, stored as small status codes so that the
+    table stays compact for cycle-time analytics. `from_status` is null for
+    the status a task was created with.
+    """
+
+    STATUS_CHOICES = [(code, name) for name, code in STATUS_CODES.items()]
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="transitions")
+    from_status = models.PositiveSmallIntegerField(
+        choices=STATUS_CHOICES, blank=True, null=True
+    )
+    to_status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES)
+    actor = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, blank=True, null=True, related_name="+"
+    )
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["task", "changed_at"], name="transition_task_time_idx"
+            ),
+            models.Index(fields=["changed_at"], name="transition_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id}: {self.from_status} -> {self.to_status}"
+
+
+class TaskMetric(models.Model):
+    """
+    Task analytics for a project, rebuilt by `manage.py compute_task_metrics`.
+    Durations are in seconds; `histogram` holds counts per HISTOGRAM_EDGES
+    bucket. Cycle-time rows carry a status, throughput rows a week and an
+    assignee.
+    """
+
+    kind = models.CharField(
+        max_length=10, choices=[(tag.name, tag.value) for tag in MetricKind]
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="task_metrics"
+    )
+    status = models.PositiveSmallIntegerField(
+        choices=TaskTransition.STATUS_CHOICES, blank=True, null=True
+    )
+    assignee = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, blank=True, null=True, related_name="+"
+    )
+    week = models.DateField(blank=True, null=True)
+    count = models.PositiveIntegerField()
+    p50 = models.FloatField(blank=True, null=True)
+    p85 = models.FloatField(blank=True, null=True)
+    p95 = models.FloatField(blank=True, null=True)
+    histogram = models.JSONField(blank=True, null=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "kind"], name="task_metric_project_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for project {self.project_id}"
+
+
+class WebhookSubscription(models.Model):
+    """
+    An endpoint receiving a project's task, comment and document events.
+    An empty `events` list subscribes to every event.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="webhooks"
+    )
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64)
+    events = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, blank=True, null=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.url} for {self.project_id}"
+
+
+class WebhookDelivery(models.Model):
+    """
+    One event queued for one subscription, written by signal receivers and
+    sent by `manage.py deliver_webhooks`. The API's write views run in a
+    transaction, so there the rows commit together with the change; writes
+    made outside one can lose an event if the process stops in between.
+    """
+
+    subscription = models.ForeignKey(
+        WebhookSubscription, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    event = models.CharField(max_length=30)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=10,
+        choices=[(tag.name, tag.value) for tag in WebhookStatus],
+        default=WebhookStatus.PENDING.name,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                name="webhook_due_idx",
+                condition=models.Q(status=WebhookStatus.PENDING.name),
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.event} to {self.subscription_id} ({self.status})"
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .enums import NotificationKind
+from .models import Notification
+
+# Text of a single event, and of a row standing for `count` events on one
+# task or, in digest mode, on all of a user's tasks.
+TEMPLATES = {
+    NotificationKind.ASSIGNED: {
+        "single": "You have been assigned to task: {title}",
+        "coalesced": "You have been assigned to task: {title} ({count} times)",
+        "digest": "You have been assigned to tasks {count} times",
+    },
+    NotificationKind.COMMENT: {
+        "single": "New comment on task '{title}' by {author}",
+        "coalesced": "{count} new comments on task '{title}'",
+        "digest": "{count} new comments on your tasks",
+    },
+}
+
+
+def get_config():
+    config = {"COALESCE_SECONDS": 3600, "DIGEST": False, "DIGEST_SECONDS": 86400}
+    config.update(getattr(settings, "NOTIFICATIONS", {}))
+    return config
+
+
+def notify(user_id, task, kind, **context):
+    """
+    Tell a user about an event on `task`. An unread notification of the
+    same kind for the same task created within COALESCE_SECONDS is updated
+    with a higher count instead of adding a row. In DIGEST mode the row is
+    shared by all of the user's tasks for DIGEST_SECONDS.
+    """
+    config = get_config()
+    digest = config["DIGEST"]
+    window = config["DIGEST_SECONDS"] if digest else config["COALESCE_SECONDS"]
+    templates = TEMPLATES[kind]
+    context["title"] = task.title
+
+    # Usually called inside the caller's transaction; no savepoint needed.
+    with transaction.atomic(savepoint=False):
+        pending = Notification.objects.filter(
+            user_id=user_id,
+            kind=kind.name,
+            mark_read=False,
+            created_at__gte=timezone.now() - timedelta(seconds=window),
+        )
+        if not digest:
+            pending = pending.filter(task=task)
+        notification = pending.select_for_update().order_by("-created_at").first()
+
+        if notification is None:
+            return Notification.objects.create(
+                user_id=user_id,
+                task=task,
+                kind=kind.name,
+                text=templates["single"].format(count=1, **context),
+            )
+
+        notification.count += 1
+        notification.task = task
+        notification.text = templates["digest" if digest else "coalesced"].format(
+            count=notification.count, **context
+        )
+        notification.save(update_fields=["count", "task", "text", "updated_at"])
+        return notification
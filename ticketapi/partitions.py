@@ -0,0 +1,139 @@
+import datetime
+import gzip
+import json
+import re
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Notification, TimeLine
+
+# Column each append-only table is range-partitioned on, one partition per
+# month, with a DEFAULT partition catching rows outside the monthly ones.
+PARTITION_COLUMNS = {TimeLine: "time", Notification: "created_at"}
+
+
+def month_start(value):
+    return value.astimezone(datetime.timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def retention_cutoff(now=None):
+    """Start of the oldest month kept under PARTITION_RETENTION_MONTHS."""
+    this_month = month_start(now or timezone.now())
+    return add_months(this_month, -settings.PARTITION_RETENTION_MONTHS)
+
+
+def is_partitioned(model):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [model._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_partitions(model):
+    """Monthly partitions of the model's table as {month start: table name}."""
+    table = model._meta.db_table
+    pattern = re.compile(rf"^{table}_(\d{{4}})(\d{{2}})$")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            month = datetime.datetime(
+                int(match[1]), int(match[2]), 1, tzinfo=datetime.timezone.utc
+            )
+            partitions[month] = name
+    return partitions
+
+
+def create_month_partition(model, month):
+    """
+    Add the partition for `month`, moving any rows for that month out of
+    the default partition first so that attaching it does not fail.
+    """
+    table = model._meta.db_table
+    column = PARTITION_COLUMNS[model]
+    name = f"{table}_{month:%Y%m}"
+    bounds = [month, add_months(month, 1)]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE "{name}" '
+            f'(LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{table}_default" '
+            f'WHERE "{column}" >= %s AND "{column}" < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            bounds,
+        )
+        cursor.execute(
+            f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+    return name
+
+
+def ensure_partitions(model, months_ahead):
+    """Create missing partitions from this month to `months_ahead` months on."""
+    existing = month_partitions(model)
+    this_month = month_start(timezone.now())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(this_month, offset)
+        if month not in existing:
+            created.append(create_month_partition(model, month))
+    return created
+
+
+def drop_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{name}"')
+
+
+def archive_rows(queryset, path, batch_size, delete=False):
+    """
+    Append the queryset's rows to a gzipped JSONL file in primary key order,
+    one batch at a time, optionally deleting each batch once it is written.
+    """
+    count = 0
+    last_pk = None
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        while True:
+            batch = queryset.order_by("pk")
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            rows = list(batch.values()[:batch_size])
+            if not rows:
+                break
+            archive.writelines(
+                json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows
+            )
+            last_pk = rows[-1]["id"]
+            if delete:
+                queryset.model.objects.filter(
+                    pk__in=[row["id"] for row in rows]
+                ).delete()
+            count += len(rows)
+    return count
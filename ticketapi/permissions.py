@@ -1,10 +1,20 @@
-from django.shortcuts import get_object_or_404
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import BasePermission
 
 from .enums import RoleChoice
+from .instrumentation import get_config
 from .models import Profile
 
 
+def user_role(user):
+    """Role of `user`; accounts without a profile, such as superusers, get 403"""
+    try:
+        return user.profile.role
+    except Profile.DoesNotExist:
+        raise PermissionDenied("This account has no profile and no role.")
+
+
 class IsManager(BasePermission):
     """
     Only managers can create/update/delete projects.
@@ -13,8 +23,7 @@ class IsManager(BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        profile = get_object_or_404(Profile, user=request.user)
-        return profile.role == RoleChoice.MANAGER.name
+        return user_role(request.user) == RoleChoice.MANAGER.name
 
 
 # class IsManagerOrReadOnlyForTasks(BasePermission):
@@ -48,4 +57,19 @@ class IsCommentAuthor(BasePermission):
     def has_object_permission(self, request, view, obj):
         if not request.user or not request.user.is_authenticated:
             return False
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
+
+
+class HasMetricsToken(BasePermission):
+    """
+    Require `Authorization: Bearer <METRICS_TOKEN>` to scrape the metrics
+    endpoint. Without a token it is closed, unless PUBLIC_METRICS opens it.
+    """
+
+    def has_permission(self, request, view):
+        config = get_config()
+        token = config["METRICS_TOKEN"]
+        if not token:
+            return config["PUBLIC_METRICS"]
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        return constant_time_compare(header, f"Bearer {token}")
@@ -0,0 +1,87 @@
+from django.db import transaction
+
+from .membership import Membership, invalidate_member_lists
+from .models import (
+    Comments,
+    Document,
+    DocumentIndex,
+    Notification,
+    Project,
+    Task,
+    TaskMetric,
+    TaskTransition,
+    TimeLine,
+    WebhookDelivery,
+    WebhookSubscription,
+)
+
+
+def raw_delete(queryset):
+    """
+    DELETE the matching rows in one statement, without loading them,
+    cascading or sending delete signals. The soft delete has already
+    recorded timeline events, tombstones and webhooks for them.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete rows by primary key, one short transaction per batch"""
+    count = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return count
+        with transaction.atomic():
+            count += raw_delete(queryset.model._base_manager.filter(pk__in=pks))
+
+
+def purge_tasks(queryset, batch_size):
+    """Remove tasks with their comments and transitions, batch by batch"""
+    count = 0
+    while True:
+        task_ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not task_ids:
+            return count
+        delete_in_batches(Comments.objects.filter(task_id__in=task_ids), batch_size)
+        delete_in_batches(
+            TaskTransition.objects.filter(task_id__in=task_ids), batch_size
+        )
+        with transaction.atomic():
+            Notification.objects.filter(task_id__in=task_ids).update(task=None)
+            count += raw_delete(Task.all_objects.filter(pk__in=task_ids))
+
+
+def purge_documents(queryset, batch_size):
+    """Remove documents and, once each batch has committed, their files"""
+    count = 0
+    while True:
+        rows = list(queryset.values_list("pk", "file")[:batch_size])
+        if not rows:
+            return count
+        storage = Document._meta.get_field("file").storage
+        document_ids = [pk for pk, _ in rows]
+        with transaction.atomic():
+            raw_delete(DocumentIndex.objects.filter(document_id__in=document_ids))
+            count += raw_delete(Document.objects.filter(pk__in=document_ids))
+            for _, name in rows:
+                if name:
+                    transaction.on_commit(lambda name=name: storage.delete(name))
+
+
+def purge_project(project_id, batch_size):
+    """Remove a soft-deleted project and everything that belongs to it"""
+    purge_tasks(Task.all_objects.filter(project_id=project_id), batch_size)
+    purge_documents(Document.objects.filter(project_id=project_id), batch_size)
+    delete_in_batches(TimeLine.objects.filter(project_id=project_id), batch_size)
+    delete_in_batches(TaskMetric.objects.filter(project_id=project_id), batch_size)
+    delete_in_batches(
+        WebhookDelivery.objects.filter(subscription__project_id=project_id),
+        batch_size,
+    )
+    with transaction.atomic():
+        raw_delete(WebhookSubscription.objects.filter(project_id=project_id))
+        raw_delete(Membership.objects.filter(project_id=project_id))
+        # Whatever is left is cascaded by the ORM as usual.
+        Project.all_objects.filter(pk=project_id).delete()
+    invalidate_member_lists([project_id])
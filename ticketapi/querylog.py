@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import random
+import re
+import traceback
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import Counter
+
+from .instrumentation import REGISTRY
+
+logger = logging.getLogger("ticketapi.querylog")
+
+SLOW_QUERIES = Counter(
+    "ticketapi_slow_queries",
+    "Queries slower than the configured threshold.",
+    ["view"],
+    registry=REGISTRY,
+)
+REPEATED_QUERIES = Counter(
+    "ticketapi_repeated_queries",
+    "Query shapes repeated often enough within one request to look like an N+1.",
+    ["view"],
+    registry=REGISTRY,
+)
+
+# `IN (%s, %s, %s)` lists differ only in length; they are the same query.
+_PLACEHOLDER_LIST = re.compile(r"\(%s(?:, %s)+\)")
+_PROJECT_ROOT = str(settings.BASE_DIR)
+
+
+def get_config():
+    config = {"SAMPLE_RATE": 1.0, "SLOW_QUERY_MS": 200, "REPEAT_THRESHOLD": 5}
+    config.update(getattr(settings, "QUERY_INSPECTION", {}))
+    return config
+
+
+def query_shape(sql):
+    return _PLACEHOLDER_LIST.sub("(%s, ...)", sql)
+
+
+def stack_fingerprint():
+    """
+    Short hash of the project frames that issued the current query, and the
+    innermost of those frames for the log line.
+    """
+    frames = [
+        f"{frame.filename}:{frame.lineno}:{frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(_PROJECT_ROOT)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    digest = hashlib.sha1("|".join(frames).encode()).hexdigest()[:12]
+    return digest, frames[-1] if frames else "<unknown>"
+
+
+class QueryInspector:
+    """
+    Execute wrapper logging slow queries and query shapes that repeat
+    within a single request.
+    """
+
+    def __init__(self, slow_query_ms, repeat_threshold):
+        self.view_name = "unmatched"
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.repeat_threshold = repeat_threshold
+        self.counts = {}
+        self.repeated = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            if duration >= self.slow_query_seconds:
+                SLOW_QUERIES.labels(self.view_name).inc()
+                logger.warning(
+                    "Slow query (%.1f ms) in %s: %s",
+                    duration * 1000,
+                    self.view_name,
+                    sql,
+                )
+
+            shape = query_shape(sql)
+            count = self.counts.get(shape, 0) + 1
+            self.counts[shape] = count
+            if count == self.repeat_threshold:
+                self.repeated[shape] = stack_fingerprint()
+
+    def report(self):
+        for shape, (fingerprint, origin) in self.repeated.items():
+            REPEATED_QUERIES.labels(self.view_name).inc()
+            logger.warning(
+                "Possible N+1 in %s: query repeated %d times [%s at %s]: %s",
+                self.view_name,
+                self.counts[shape],
+                fingerprint,
+                origin,
+                shape,
+            )
+
+
+class QueryInspectionMiddleware:
+    """
+    Install a QueryInspector on every database connection for a sample
+    of requests and report repeated queries once the response is ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        if config["SAMPLE_RATE"] < 1.0 and random.random() >= config["SAMPLE_RATE"]:
+            return self.get_response(request)
+
+        inspector = QueryInspector(config["SLOW_QUERY_MS"], config["REPEAT_THRESHOLD"])
+        request.query_inspector = inspector
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspector))
+            response = self.get_response(request)
+        inspector.report()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        inspector = getattr(request, "query_inspector", None)
+        if inspector is not None:
+            inspector.view_name = request.resolver_match.view_name
@@ -1,17 +1,73 @@
 import re
+import secrets
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
+from django.db import models
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 
-from .enums import RoleChoice
-from .models import Comments, Document, Notification, Profile, Project, Task, TimeLine
+from .enums import RoleChoice, TaskStatus
+from .instrumentation import TimedModelSerializer
+from .membership import project_member_lists
+from .models import (
+    STATUS_CODES,
+    Comments,
+    Document,
+    Notification,
+    Profile,
+    Project,
+    Task,
+    TaskMetric,
+    TimeLine,
+    WebhookSubscription,
+)
+from .permissions import user_role
+from .user_cache import get_user_summaries, get_user_summary
+from .webhooks import WEBHOOK_EVENTS, check_url, get_config
+from .workflow import (
+    can_transition,
+    normalize_status,
+    record_transitions,
+    transition_error,
+)
 
 User = get_user_model()
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class UserSummaryListSerializer(serializers.ListSerializer):
+    """
+    Fetch the summaries of every user referenced by the listed objects in
+    one cache lookup, so that the child serializers need no user joins.
+    """
+
+    def to_representation(self, data):
+        items = list(
+            data.all() if isinstance(data, models.manager.BaseManager) else data
+        )
+        self.context.setdefault("user_summaries", {}).update(
+            get_user_summaries(self.child.referenced_user_ids(items))
+        )
+        return super().to_representation(items)
+
+
+class UserSummaryMixin:
+    """Render related users from their cached summaries, by id."""
+
+    user_id_fields = ()
+
+    def referenced_user_ids(self, items):
+        return {getattr(item, field) for item in items for field in self.user_id_fields}
+
+    def user_summary(self, user_id):
+        summaries = self.context.get("user_summaries", {})
+        if user_id in summaries:
+            return summaries[user_id]
+        return get_user_summary(user_id)
+
+
+class ProfileSerializer(TimedModelSerializer):
     class Meta:
         model = Profile
         fields = ["id", "profile_picture", "phone", "role"]
@@ -37,7 +93,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         return value
 
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(TimedModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     full_name = serializers.SerializerMethodField()
     display_name = serializers.CharField(source="username", read_only=True)
@@ -112,7 +168,7 @@ class LogoutSerializer(serializers.Serializer):
         RefreshToken(self.validated_data["refresh"]).blacklist()
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(UserSummaryMixin, TimedModelSerializer):
     team_members = serializers.SerializerMethodField()
     team_member_ids = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -133,16 +189,25 @@ class ProjectSerializer(serializers.ModelSerializer):
             "team_members",
             "team_member_ids",
         ]
+        list_serializer_class = UserSummaryListSerializer
+
+    def referenced_user_ids(self, items):
+        member_lists = project_member_lists([project.pk for project in items])
+        self.context.setdefault("project_members", {}).update(member_lists)
+        return {user_id for ids in member_lists.values() for user_id in ids}
 
     def get_team_members(self, obj):
-        return [
-            {"id": user.id, "username": user.username, "email": user.email}
-            for user in obj.team_members.all()
-        ]
+        member_ids = self.context.get("project_members", {}).get(obj.pk)
+        if member_ids is None:
+            member_ids = project_member_lists([obj.pk])[obj.pk]
+        summaries = self.context.get("user_summaries", {})
+        if not summaries.keys() >= set(member_ids):
+            summaries = get_user_summaries(member_ids)
+        return [summaries[user_id] for user_id in member_ids if user_id in summaries]
 
     def create(self, validated_data):
         user = self.context["request"].user
-        if user.profile.role != RoleChoice.MANAGER.name:
+        if user_role(user) != RoleChoice.MANAGER.name:
             raise serializers.ValidationError("Only managers can create projects.")
 
         team_members = validated_data.pop("team_members", [])
@@ -153,7 +218,8 @@ class ProjectSerializer(serializers.ModelSerializer):
         return project
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(UserSummaryMixin, TimedModelSerializer):
+    user_id_fields = ["assignee_id"]
     assignee = serializers.SerializerMethodField()
     project = serializers.StringRelatedField(read_only=True)
     assignee_id = serializers.PrimaryKeyRelatedField(
@@ -179,19 +245,48 @@ class TaskSerializer(serializers.ModelSerializer):
             "assignee",
             "assignee_id",
         ]
+        list_serializer_class = UserSummaryListSerializer
 
     def get_assignee(self, obj):
-        if obj.assignee:
-            return {
-                "id": obj.assignee.id,
-                "username": obj.assignee.username,
-                "email": obj.assignee.email,
-            }
-        return None
+        return self.user_summary(obj.assignee_id)
+
+    def validate_status(self, value):
+        """
+        New tasks start OPEN; status changes must follow the workflow for
+        the user's role.
+        """
+        if self.instance is None:
+            if normalize_status(value) != TaskStatus.OPEN.name:
+                raise serializers.ValidationError(
+                    f"New tasks start in {TaskStatus.OPEN.name}."
+                )
+            return value
+        current = normalize_status(self.instance.status)
+        if value == current:
+            return value
+        role = user_role(self.context["request"].user)
+        if not can_transition(role, current, value):
+            raise serializers.ValidationError(transition_error(role, current, value))
+        return value
+
+    def create(self, validated_data):
+        task = super().create(validated_data)
+        record_transitions([(task, None)], self.context["request"].user)
+        return task
 
+    def update(self, instance, validated_data):
+        previous = instance.status
+        task = super().update(instance, validated_data)
+        if normalize_status(previous) != normalize_status(task.status):
+            record_transitions([(task, previous)], self.context["request"].user)
+        return task
 
-class DocumentSerializer(serializers.ModelSerializer):
+
+class DocumentSerializer(TimedModelSerializer):
     project = serializers.StringRelatedField(read_only=True)
+    # Files are read through download_url, which checks membership.
+    file = serializers.FileField(write_only=True)
+    download_url = serializers.SerializerMethodField()
     project_id = serializers.PrimaryKeyRelatedField(
         queryset=Project.objects.all(), source="project", write_only=True
     )
@@ -203,13 +298,20 @@ class DocumentSerializer(serializers.ModelSerializer):
             "name",
             "description",
             "file",
+            "download_url",
             "version",
             "project",
             "project_id",
         ]
 
+    def get_download_url(self, obj):
+        url = reverse("document-download", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
 
-class CommentsSerializer(serializers.ModelSerializer):
+class CommentsSerializer(UserSummaryMixin, TimedModelSerializer):
+    user_id_fields = ["author_id"]
     author = serializers.SerializerMethodField()
     task = serializers.StringRelatedField(read_only=True)
     project = serializers.StringRelatedField(read_only=True)
@@ -218,7 +320,10 @@ class CommentsSerializer(serializers.ModelSerializer):
         queryset=Task.objects.all(), source="task", write_only=True
     )
     project_id = serializers.PrimaryKeyRelatedField(
-        queryset=Project.objects.all(), source="project", write_only=True
+        queryset=Project.objects.all(),
+        source="project",
+        write_only=True,
+        required=False,
     )
 
     class Meta:
@@ -234,13 +339,22 @@ class CommentsSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = ["created_at"]
+        list_serializer_class = UserSummaryListSerializer
 
     def get_author(self, obj):
-        return {
-            "id": obj.author.id,
-            "username": obj.author.username,
-            "email": obj.author.email,
-        }
+        return self.user_summary(obj.author_id)
+
+    def validate(self, attrs):
+        """The comment's project is the task's project"""
+        task = attrs.get("task", self.instance.task if self.instance else None)
+        project = attrs.get("project")
+        if task and project and project.pk != task.project_id:
+            raise serializers.ValidationError(
+                {"project_id": "Task does not belong to this project."}
+            )
+        if task:
+            attrs["project"] = task.project
+        return attrs
 
     def create(self, validated_data):
 
@@ -248,32 +362,129 @@ class CommentsSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TimeLineSerializer(serializers.ModelSerializer):
+class TimeLineSerializer(TimedModelSerializer):
     project = serializers.StringRelatedField(read_only=True)
 
     class Meta:
         model = TimeLine
-        fields = ["id", "event_type", "time", "project"]
+        fields = [
+            "id",
+            "event_type",
+            "time",
+            "project",
+            "target_type",
+            "target_id",
+            "changes",
+        ]
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(UserSummaryMixin, TimedModelSerializer):
+    user_id_fields = ["user_id"]
     user = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
-        fields = ["id", "text", "user", "created_at", "mark_read"]
+        fields = [
+            "id",
+            "text",
+            "user",
+            "task",
+            "kind",
+            "count",
+            "created_at",
+            "updated_at",
+            "mark_read",
+        ]
+        read_only_fields = ["task", "kind", "count", "updated_at"]
+        list_serializer_class = UserSummaryListSerializer
 
     def get_user(self, obj):
-        return {
-            "id": obj.user.id,
-            "username": obj.user.username,
-            "email": obj.user.email,
-        }
+        return self.user_summary(obj.user_id)
+
+
+class TaskMetricSerializer(UserSummaryMixin, TimedModelSerializer):
+    user_id_fields = ["assignee_id"]
+    status = serializers.SerializerMethodField()
+    assignee = serializers.SerializerMethodField()
+
+    STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+    class Meta:
+        model = TaskMetric
+        fields = [
+            "kind",
+            "status",
+            "week",
+            "assignee",
+            "count",
+            "p50",
+            "p85",
+            "p95",
+            "histogram",
+        ]
+        list_serializer_class = UserSummaryListSerializer
+
+    def get_status(self, obj):
+        return self.STATUS_NAMES.get(obj.status)
+
+    def get_assignee(self, obj):
+        return self.user_summary(obj.assignee_id)
+
+
+class WebhookSubscriptionSerializer(TimedModelSerializer):
+    events = serializers.ListField(
+        child=serializers.ChoiceField(choices=WEBHOOK_EVENTS), required=False
+    )
+    secret = serializers.CharField(
+        write_only=True, required=False, min_length=16, max_length=64
+    )
+
+    class Meta:
+        model = WebhookSubscription
+        fields = ["id", "project", "url", "events", "is_active", "secret", "created_at"]
+        read_only_fields = ["project"]
+
+    def validate_url(self, value):
+        # Hosts that do not resolve yet are checked again before each send.
+        try:
+            check_url(value, get_config(), resolve=False)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+    def create(self, validated_data):
+        validated_data.setdefault("secret", secrets.token_hex(32))
+        return super().create(validated_data)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # The signing secret is shown once, when the subscription is created.
+        request = self.context.get("request")
+        if request is not None and request.method == "POST":
+            data["secret"] = instance.secret
+        return data
 
 
 class AssignTaskSerializer(serializers.Serializer):
     assignee_id = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
 
 
+class TaskTransitionSerializer(serializers.Serializer):
+    task_id = serializers.IntegerField()
+    status = serializers.ChoiceField(
+        choices=[(tag.name, tag.value) for tag in TaskStatus]
+    )
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    transitions = TaskTransitionSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_transitions(self, value):
+        task_ids = [item["task_id"] for item in value]
+        if len(set(task_ids)) != len(task_ids):
+            raise serializers.ValidationError("Each task may appear only once.")
+        return value
+
+
 class MarkNotificationReadSerializer(serializers.Serializer):
     mark_read = serializers.BooleanField(default=True)
@@ -1,54 +1,318 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.db.models import TextField
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import Comments, Notification, Project, Task, TimeLine
+from .enums import EventTarget, EventType, NotificationKind, SyncModel
+from .indexing import queue_document
+from .membership import (
+    invalidate_member_lists,
+    invalidate_visible_projects,
+    project_member_ids,
+)
+from .models import (
+    Comments,
+    Document,
+    Project,
+    ProjectTombstone,
+    Task,
+    TimeLine,
+    Tombstone,
+    WebhookSubscription,
+    soft_deleted,
+)
+from .notifications import notify
+from .user_cache import invalidate_user_summary
+from .webhooks import enqueue_event, invalidate_project_subscriptions
 
 User = get_user_model()
 
+# Columns whose changes are recorded on "updated" timeline events.
+TRACKED_FIELDS = {
+    Project: ["title", "description", "start_date", "end_date"],
+    Task: ["title", "description", "status", "project", "assignee"],
+}
+
+SYNC_MODELS = {
+    Task: SyncModel.TASK,
+    Comments: SyncModel.COMMENT,
+    Document: SyncModel.DOCUMENT,
+}
+
+
+def timeline_changes(sender, instance):
+    """Tracked columns changed by the save that triggered the signal"""
+    if instance.saved_changes is None:
+        return None
+    changes = {}
+    for name in TRACKED_FIELDS[sender]:
+        field = sender._meta.get_field(name)
+        if field.attname in instance.saved_changes:
+            changes[field.attname] = (
+                None
+                if isinstance(field, TextField)
+                else instance.saved_changes[field.attname]
+            )
+    return changes
+
+
+def record_event(project, event_type, target, instance, changes=None):
+    TimeLine.objects.create(
+        project=project,
+        event_type=event_type,
+        target_type=target.name,
+        target_id=instance.pk,
+        changes=changes,
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_summary(sender, instance, **kwargs):
+    """Cached summaries carry username and email, so drop them on any change"""
+    invalidate_user_summary(instance.pk)
+
 
 @receiver(post_save, sender=Project)
 def create_project_timeline(sender, instance, created, **kwargs):
     """Create timeline event when project is created/updated"""
     if created:
-        TimeLine.objects.create(project=instance, event_type="created")
+        record_event(instance, "created", EventTarget.PROJECT, instance)
+    else:
+        record_event(
+            instance,
+            "updated",
+            EventTarget.PROJECT,
+            instance,
+            timeline_changes(sender, instance),
+        )
+
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def touch_project_on_member_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Member changes alter the project representation, so bump updated_at"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        Project.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif pk_set:
+        Project.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def invalidate_membership_on_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Drop the cached visible project ids of every user whose membership changed"""
+    if reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_visible_projects([instance.pk])
+    elif action == "pre_clear":
+        instance._cleared_member_ids = project_member_ids([instance.pk])
+    elif action == "post_clear":
+        invalidate_visible_projects(getattr(instance, "_cleared_member_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        invalidate_visible_projects(pk_set)
+
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def invalidate_member_lists_on_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Drop the cached member lists of every project whose members changed"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_member_lists([instance.pk])
+    elif action == "pre_clear":
+        instance._cleared_project_ids = list(
+            instance.projects.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        invalidate_member_lists(getattr(instance, "_cleared_project_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        invalidate_member_lists(pk_set)
+
+
+def create_project_tombstones(pairs):
+    ProjectTombstone.objects.bulk_create(
+        ProjectTombstone(user_id=user_id, project_id=project_id)
+        for user_id, project_id in pairs
+    )
+
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def create_project_tombstones_on_member_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Tell the sync clients of removed members to drop the project. On clear,
+    the ids were taken at pre_clear by the cache invalidation receivers.
+    """
+    if action == "post_remove":
+        pairs = (
+            [(instance.pk, project_id) for project_id in pk_set]
+            if reverse
+            else [(user_id, instance.pk) for user_id in pk_set]
+        )
+    elif action == "post_clear":
+        pairs = (
+            [
+                (instance.pk, project_id)
+                for project_id in getattr(instance, "_cleared_project_ids", ())
+            ]
+            if reverse
+            else [
+                (user_id, instance.pk)
+                for user_id in getattr(instance, "_cleared_member_ids", ())
+            ]
+        )
     else:
-        TimeLine.objects.create(project=instance, event_type="updated")
+        return
+    create_project_tombstones(pairs)
+
+
+@receiver(soft_deleted, sender=Project)
+def create_project_tombstones_on_soft_delete(sender, instance, **kwargs):
+    create_project_tombstones(
+        (user_id, instance.pk) for user_id in project_member_ids([instance.pk])
+    )
+
+
+@receiver(pre_delete, sender=Project)
+def remember_project_members(sender, instance, **kwargs):
+    instance._deleted_member_ids = project_member_ids([instance.pk])
 
 
 @receiver(post_delete, sender=Project)
+def invalidate_membership_on_delete(sender, instance, **kwargs):
+    invalidate_visible_projects(getattr(instance, "_deleted_member_ids", ()))
+    invalidate_member_lists([instance.pk])
+
+
+@receiver(soft_deleted, sender=Project)
+def invalidate_membership_on_soft_delete(sender, instance, **kwargs):
+    """Deleted projects drop out of their members' visible project ids"""
+    invalidate_visible_projects(project_member_ids([instance.pk]))
+
+
+@receiver(soft_deleted, sender=Project)
 def create_project_deleted_timeline(sender, instance, **kwargs):
     """Create timeline event when project is deleted"""
-    TimeLine.objects.create(project=instance, event_type="deleted")
+    record_event(instance, "deleted", EventTarget.PROJECT, instance)
 
 
 @receiver(post_save, sender=Task)
 def create_task_timeline_and_notifications(sender, instance, created, **kwargs):
     if created:
-        TimeLine.objects.create(project=instance.project, event_type="created")
+        record_event(instance.project, "created", EventTarget.TASK, instance)
     else:
-        TimeLine.objects.create(project=instance.project, event_type="updated")
+        record_event(
+            instance.project,
+            "updated",
+            EventTarget.TASK,
+            instance,
+            timeline_changes(sender, instance),
+        )
 
-    if instance.assignee:
-        Notification.objects.create(
-            user=instance.assignee,
-            text=f"You have been assigned to task: {instance.title}",
+    # Only a new assignee is notified, not every save of an assigned task.
+    changes = None if created else instance.saved_changes
+    if instance.assignee_id and (changes is None or "assignee_id" in changes):
+        notify(instance.assignee_id, instance, NotificationKind.ASSIGNED)
+
+
+@receiver(post_save, sender=Task)
+def move_comments_with_task(sender, instance, created, **kwargs):
+    """Keep Comments.project in step when a task moves to another project"""
+    changes = instance.saved_changes
+    if not created and changes and "project_id" in changes:
+        # The comments' representation changes too: bump them for sync/ETags.
+        Comments.objects.filter(task=instance).update(
+            project_id=instance.project_id, updated_at=timezone.now()
         )
 
 
 @receiver(post_delete, sender=Task)
+@receiver(soft_deleted, sender=Task)
 def create_task_deleted_timeline(sender, instance, **kwargs):
     """Create timeline event when task is deleted"""
-    TimeLine.objects.create(project=instance.project, event_type="deleted")
+    record_event(instance.project, "deleted", EventTarget.TASK, instance)
+
+
+@receiver(soft_deleted, sender=Task)
+def hide_comments_of_deleted_task(sender, instance, **kwargs):
+    Comments.objects.filter(task=instance).update(deleted_at=instance.deleted_at)
 
 
 @receiver(post_save, sender=Comments)
 def create_comment_notifications(sender, instance, created, **kwargs):
     """Create notifications when comments are added to tasks"""
-    if created and instance.task and instance.task.assignee:
+    if created and instance.task and instance.task.assignee_id:
 
-        if instance.author != instance.task.assignee:
-            Notification.objects.create(
-                user=instance.task.assignee,
-                text=f"New comment on task '{instance.task.title}' by {instance.author.email}",
+        if instance.author_id != instance.task.assignee_id:
+            notify(
+                instance.task.assignee_id,
+                instance.task,
+                NotificationKind.COMMENT,
+                author=instance.author.email,
             )
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comments)
+@receiver(post_delete, sender=Document)
+@receiver(soft_deleted, sender=Task)
+def create_tombstone(sender, instance, **kwargs):
+    """Remember deleted objects so that sync clients can drop them"""
+    Tombstone.objects.create(
+        model=SYNC_MODELS[sender].name,
+        object_id=instance.pk,
+        project_id=instance.project_id,
+    )
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comments)
+@receiver(post_save, sender=Document)
+def enqueue_webhook_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    enqueue_event(
+        SYNC_MODELS[sender],
+        EventType.CREATED if created else EventType.UPDATED,
+        instance,
+        None if created else getattr(instance, "saved_changes", None),
+    )
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comments)
+@receiver(post_delete, sender=Document)
+@receiver(soft_deleted, sender=Task)
+def enqueue_webhook_on_delete(sender, instance, **kwargs):
+    enqueue_event(SYNC_MODELS[sender], EventType.DELETED, instance)
+
+
+@receiver(post_save, sender=WebhookSubscription)
+@receiver(post_delete, sender=WebhookSubscription)
+def invalidate_cached_subscriptions(sender, instance, **kwargs):
+    # After commit, so that no request re-caches the rows being replaced.
+    project_id = instance.project_id
+    transaction.on_commit(lambda: invalidate_project_subscriptions(project_id))
+
+
+@receiver(post_save, sender=Document)
+def queue_document_indexing(sender, instance, created, **kwargs):
+    """
+    Extraction runs in `manage.py index_documents`, not in the request. Only
+    new documents and ones whose stored file changed are queued again.
+    """
+    changes = None if created else instance.saved_changes
+    if changes is None or "file" in changes:
+        queue_document(instance.pk)
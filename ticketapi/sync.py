@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .membership import visible_project_ids
+from .models import Comments, Document, ProjectTombstone, Task, Tombstone
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(cursor):
+    try:
+        return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError):
+        raise serializers.ValidationError({"since": "Invalid sync cursor."})
+
+
+def next_cursor(started_at):
+    """
+    Cursor for the next sync. It is moved back by SYNC_CURSOR_OVERLAP_SECONDS
+    so that rows saved just before this sync but committed after it are
+    still picked up; clients upsert by id, so repeats are harmless.
+    """
+    overlap = timedelta(seconds=getattr(settings, "SYNC_CURSOR_OVERLAP_SECONDS", 2))
+    return encode_cursor(started_at - overlap)
+
+
+def changes_since(user, since=None):
+    """
+    Querysets of the objects `user` can see that changed after `since`, of
+    the ones deleted since, and of the ids of projects the user lost sight
+    of since, whose objects the client should drop.
+    """
+    project_ids = visible_project_ids(user)
+    tasks = Task.objects.filter(project_id__in=project_ids).select_related("project")
+    comments = Comments.objects.filter(
+        project_id__in=project_ids, deleted_at__isnull=True
+    ).select_related("task", "project")
+    documents = Document.objects.filter(project_id__in=project_ids).select_related(
+        "project"
+    )
+    tombstones = Tombstone.objects.filter(project_id__in=project_ids).values_list(
+        "model", "object_id"
+    )
+    # A project the user was added back to is visible again.
+    removed_projects = (
+        ProjectTombstone.objects.filter(user_id=user.pk)
+        .exclude(project_id__in=project_ids)
+        .values_list("project_id", flat=True)
+        .distinct()
+    )
+
+    if since is None:
+        tombstones = tombstones.none()
+        removed_projects = removed_projects.none()
+    else:
+        tasks = tasks.filter(updated_at__gt=since)
+        comments = comments.filter(updated_at__gt=since)
+        documents = documents.filter(updated_at__gt=since)
+        tombstones = tombstones.filter(deleted_at__gt=since)
+        removed_projects = removed_projects.filter(deleted_at__gt=since)
+    return tasks, comments, documents, tombstones, removed_projects
@@ -1,9 +1,74 @@
+import csv
+import gzip
+import hashlib
+import hmac
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 
+from .db_routing import PIN_COOKIE, ReplicaRouter, pin_cache_key, routing_for
 from .enums import RoleChoice
+from .extraction import extract_terms
+from .membership import cache_key, project_member_lists, visible_project_ids
+from .metrics import DAY, HOUR, TaskMetricsAccumulator
+from .models import (
+    Comments,
+    Document,
+    DocumentIndex,
+    Notification,
+    Profile,
+    Project,
+    Task,
+    TaskTransition,
+    TimeLine,
+    Tombstone,
+    WebhookDelivery,
+    WebhookSubscription,
+)
+from .partitions import (
+    add_months,
+    create_month_partition,
+    is_partitioned,
+    month_partitions,
+    month_start,
+)
+from .querylog import QueryInspector, query_shape
+from .throttling import UserWriteThrottle
+from .user_cache import get_user_summaries, local_cache
+from .webhooks import (
+    WebhookSender,
+    claim_batch,
+    deliver_pending,
+    get_config,
+    record_results,
+    subscriptions_cache_key,
+)
+from .workflow import TRANSITIONS, normalize_status
 
 User = get_user_model()
 
@@ -274,3 +339,1598 @@ class ProjectTaskTestCase(UserRegisterAuth):
         print(response.json())
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(any("QA Testing Task" in n["text"] for n in response.data))
+
+
+class Fixtures:
+    """Users created directly through the ORM, skipping password hashing."""
+
+    databases = "__all__"
+
+    def make_user(self, name, role=RoleChoice.DEVELOPER.name):
+        user = User.objects.create(email=f"{name}@company.com", username=name)
+        Profile.objects.create(
+            user=user, phone=f"+92300{user.id:07d}", role=role
+        )
+        return user
+
+    def make_project(self, *members, title="Project"):
+        project = Project.objects.create(
+            title=title, description="Fixture project", start_date="2024-01-12"
+        )
+        project.team_members.add(*members)
+        return project
+
+    def make_task(self, project, assignee=None, title="Task"):
+        return Task.objects.create(
+            title=title, description="Fixture task", project=project, assignee=assignee
+        )
+
+
+class FixtureTestCase(Fixtures, APITestCase):
+    pass
+
+
+class PerformanceInstrumentationTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.make_task(self.project)
+        self.client.force_authenticate(self.manager)
+
+    def test_server_timing_header_reports_db_time(self):
+        response = self.client.get(reverse("task-list-create"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn("queries", response["Server-Timing"])
+
+    def test_metrics_endpoint_exposes_view_histograms(self):
+        self.client.get(reverse("task-list-create"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('ticketapi_request_seconds_bucket{le="0.005",view="task-list-create"}', body)
+        self.assertIn("ticketapi_db_queries_count", body)
+
+    @override_settings(PERF_INSTRUMENTATION={"SAMPLE_RATE": 0.0})
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client.get(reverse("task-list-create"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(PERF_INSTRUMENTATION={})
+    def test_metrics_endpoint_is_closed_by_default(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    @override_settings(PERF_INSTRUMENTATION={"METRICS_TOKEN": "secret"})
+    def test_metrics_endpoint_requires_configured_token(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN
+        )
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class QueryInspectionTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.tasks = [self.make_task(self.project, title=f"Task {i}") for i in range(6)]
+
+    def test_in_lists_of_any_length_share_a_shape(self):
+        self.assertEqual(
+            query_shape('SELECT 1 WHERE "id" IN (%s, %s, %s)'),
+            query_shape('SELECT 1 WHERE "id" IN (%s, %s)'),
+        )
+
+    def test_repeated_query_shape_is_reported_with_fingerprint(self):
+        inspector = QueryInspector(slow_query_ms=10_000, repeat_threshold=5)
+        with connection.execute_wrapper(inspector):
+            for task in self.tasks:
+                Task.objects.get(id=task.id)
+        with self.assertLogs("ticketapi.querylog", "WARNING") as logs:
+            inspector.report()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Possible N+1", logs.output[0])
+        self.assertIn("repeated 6 times", logs.output[0])
+        self.assertIn("tests.py", logs.output[0])
+
+    @override_settings(QUERY_INSPECTION={"SLOW_QUERY_MS": 0})
+    def test_slow_queries_are_logged_with_view_name(self):
+        self.client.force_authenticate(self.manager)
+        with self.assertLogs("ticketapi.querylog", "WARNING") as logs:
+            self.client.get(reverse("task-list-create"))
+        self.assertTrue(
+            any("Slow query" in line and "task-list-create" in line for line in logs.output)
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        cache.clear()
+
+    def route_read(self, request):
+        with routing_for(request):
+            return self.router.db_for_read(Task)
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.route_read(self.factory.get("/api/tasks/")), "replica")
+
+    def test_unsafe_requests_and_background_reads_use_primary(self):
+        self.assertIsNone(self.route_read(self.factory.post("/api/tasks/")))
+        self.assertIsNone(self.router.db_for_read(Task))
+
+    def test_pin_cookie_keeps_reads_on_primary(self):
+        request = self.factory.get("/api/tasks/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        self.assertIsNone(self.route_read(request))
+
+    def test_recent_writer_is_pinned_through_cache(self):
+        cache.set(pin_cache_key(self.manager.pk), 1)
+        request = self.factory.get("/api/tasks/")
+        request.user = self.manager
+        self.assertIsNone(self.route_read(request))
+
+    def test_successful_write_pins_client(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.post(
+            reverse("task-list-create"),
+            {"title": "New", "description": "Write", "project_id": self.project.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(cache.get(pin_cache_key(self.manager.pk)))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica", "ticketapi"))
+        self.assertTrue(self.router.allow_migrate("default", "ticketapi"))
+
+
+# The replica is a second connection to the test database, which only sees
+# committed rows, so these tests run outside a wrapping transaction.
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaConnectionTestCase(Fixtures, APITransactionTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.make_task(self.project)
+        self.client.force_authenticate(self.manager)
+        self.addCleanup(cache.clear)
+
+    def task_selects(self, queries):
+        return [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and '"ticketapi_task"' in query["sql"]
+        ]
+
+    def task_queries(self, alias, method, *args, **kwargs):
+        """Status code and queries on `alias` that read the task table"""
+        with CaptureQueriesContext(connections[alias]) as queries:
+            response = method(*args, **kwargs)
+        return response.status_code, self.task_selects(queries)
+
+    def test_safe_requests_read_from_the_replica(self):
+        url = reverse("task-list-create")
+        with CaptureQueriesContext(connections["default"]) as primary:
+            code, selects = self.task_queries("replica", self.client.get, url)
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertTrue(selects)
+        self.assertEqual(self.task_selects(primary), [])
+
+    def test_reads_after_a_write_are_pinned_to_the_primary(self):
+        url = reverse("task-list-create")
+        response = self.client.post(
+            url,
+            {"title": "New", "description": "Write", "project_id": self.project.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        code, replica = self.task_queries("replica", self.client.get, url)
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertEqual(replica, [])
+        _, primary = self.task_queries("default", self.client.get, url)
+        self.assertTrue(primary)
+
+
+class PartitionRetentionTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.client.force_authenticate(self.manager)
+        self.old_month = add_months(month_start(timezone.now()), -24)
+
+    def make_old_event(self):
+        event = TimeLine.objects.create(project=self.project, event_type="updated")
+        TimeLine.objects.filter(id=event.id).update(time=self.old_month + timedelta(days=3))
+        return event
+
+    def test_tables_are_partitioned_by_month(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("Partitioning is PostgreSQL only")
+        self.assertTrue(is_partitioned(TimeLine))
+        self.assertTrue(is_partitioned(Notification))
+        self.assertIn(month_start(timezone.now()), month_partitions(TimeLine))
+
+    def test_expired_rows_are_hidden_from_the_timeline(self):
+        event = self.make_old_event()
+        response = self.client.get(reverse("timeline-list"))
+        self.assertNotIn(event.id, [row["id"] for row in response.data])
+
+    def test_archive_exports_and_drops_expired_partitions(self):
+        event = self.make_old_event()
+        if is_partitioned(TimeLine):
+            name = create_month_partition(TimeLine, self.old_month)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command("archive_partitions", output_dir=output_dir, stdout=StringIO())
+            lines = []
+            for path in Path(output_dir).glob("ticketapi_timeline_*.jsonl.gz"):
+                with gzip.open(path, "rt") as archive:
+                    lines.extend(json.loads(line) for line in archive)
+
+        self.assertEqual([row["id"] for row in lines], [event.id])
+        self.assertFalse(TimeLine.objects.filter(id=event.id).exists())
+        if is_partitioned(TimeLine):
+            self.assertNotIn(name, month_partitions(TimeLine).values())
+
+
+class TimeLineChangesTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager, self.developer)
+        self.task = self.make_task(self.project)
+        self.client.force_authenticate(self.manager)
+
+    def test_task_update_records_target_and_changed_fields(self):
+        response = self.client.patch(
+            reverse("task-detail", args=[self.task.id]),
+            {"status": "WORKING", "description": "Longer description"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        event = TimeLine.objects.filter(event_type="updated").latest("id")
+        self.assertEqual(event.target_type, "TASK")
+        self.assertEqual(event.target_id, self.task.id)
+        self.assertEqual(
+            event.changes, {"status": ["OPEN", "WORKING"], "description": None}
+        )
+
+    def test_project_creation_records_target_without_changes(self):
+        event = TimeLine.objects.filter(project=self.project, target_type="PROJECT").get()
+        self.assertEqual(event.event_type, "created")
+        self.assertEqual(event.target_id, self.project.id)
+        self.assertIsNone(event.changes)
+
+    def test_timeline_endpoint_exposes_changes(self):
+        self.task.assignee = self.developer
+        self.task.save()
+        response = self.client.get(reverse("timeline-list"))
+        latest = response.data[0]
+        self.assertEqual(latest["target_type"], "TASK")
+        self.assertEqual(latest["changes"], {"assignee_id": [None, self.developer.id]})
+
+    def test_unchanged_save_skips_write_and_signals(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = task.title
+        with self.assertNumQueries(0):
+            task.save()
+        self.assertFalse(TimeLine.objects.filter(event_type="updated").exists())
+
+    def test_deferred_field_assigned_without_loading_is_saved(self):
+        task = Task.objects.only("id", "title").get(pk=self.task.pk)
+        task.status = "WORKING"
+        task.save()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "WORKING")
+        event = TimeLine.objects.filter(event_type="updated").latest("id")
+        self.assertEqual(event.changes, {"status": ["OPEN", "WORKING"]})
+
+    def test_changes_are_compared_with_loaded_values(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = "Renamed"
+        task.save()
+        self.assertEqual(task.saved_changes, {"title": ["Task", "Renamed"]})
+        with self.assertNumQueries(0):
+            task.save()
+
+
+class DeltaSyncTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.outsider = self.make_user("outsider")
+        self.project = self.make_project(self.manager)
+        self.other_project = self.make_project(self.outsider, title="Other")
+        self.task = self.make_task(self.project, title="Visible")
+        self.make_task(self.other_project, title="Hidden")
+        self.client.force_authenticate(self.manager)
+
+    def sync(self, cursor=None):
+        params = {"since": cursor} if cursor else {}
+        response = self.client.get(reverse("sync"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_initial_sync_returns_everything_visible(self):
+        data = self.sync()
+        self.assertEqual([task["id"] for task in data["tasks"]], [self.task.id])
+        self.assertEqual(
+            data["deleted"], {"task": [], "comment": [], "document": [], "project": []}
+        )
+
+    def test_sync_returns_only_changes_after_cursor(self):
+        unchanged = self.make_task(self.project, title="Unchanged")
+        cursor = self.sync()["cursor"]
+        Task.objects.filter(id__in=[self.task.id, unchanged.id]).update(
+            updated_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        self.task.title = "Renamed"
+        self.task.save()
+        comment = Comments.objects.create(
+            text="New", author=self.manager, task=self.task, project=self.project
+        )
+
+        data = self.sync(cursor)
+        self.assertEqual([task["id"] for task in data["tasks"]], [self.task.id])
+        self.assertEqual([row["id"] for row in data["comments"]], [comment.id])
+        self.assertEqual(data["documents"], [])
+
+    def test_deletions_are_reported_as_tombstones(self):
+        cursor = self.sync()["cursor"]
+        task_id = self.task.id
+        self.task.delete()
+        data = self.sync(cursor)
+        self.assertEqual(data["deleted"]["task"], [task_id])
+        self.assertEqual(data["tasks"], [])
+
+    def test_removed_member_is_told_to_drop_the_project(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.team_members.remove(self.manager)
+        data = self.sync(cursor)
+        self.assertEqual(data["deleted"]["project"], [self.project.id])
+        self.assertEqual(data["tasks"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.team_members.add(self.manager)
+        self.assertEqual(self.sync(cursor)["deleted"]["project"], [])
+
+    def test_deleted_project_is_dropped_by_its_members(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.soft_delete()
+        self.assertEqual(self.sync(cursor)["deleted"]["project"], [self.project.id])
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.sync(cursor)["deleted"]["project"], [])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("sync"), {"since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalRequestTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager)
+        self.task = self.make_task(self.project)
+        self.client.force_authenticate(self.manager)
+        self.url = reverse("task-detail", args=[self.task.id])
+
+    def test_revalidating_unchanged_task_returns_304_without_serializing(self):
+        etag = self.client.get(self.url)["ETag"]
+        # A fresh user, as on a real request, whose profile is not cached.
+        self.client.force_authenticate(User.objects.get(pk=self.manager.pk))
+        # Permission check plus the version lookup.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_plain_get_loads_the_object_once(self):
+        visible_project_ids(self.manager)
+        self.client.force_authenticate(User.objects.get(pk=self.manager.pk))
+        # Permission check plus the task itself.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_changed_task_is_sent_again(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.task.title = "Changed"
+        self.task.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_stale_if_match_rejects_update(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.task.title = "Concurrent edit"
+        self.task.save()
+        response = self.client.patch(
+            self.url, {"title": "Mine"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, "Concurrent edit")
+
+    def test_current_if_match_allows_update_and_returns_new_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.patch(
+            self.url, {"title": "Mine"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_revalidation_still_checks_object_permissions(self):
+        self.project.team_members.add(self.developer)
+        comment = Comments.objects.create(text="Mine", author=self.developer, task=self.task)
+        url = reverse("comment-detail", args=[comment.id])
+        self.client.force_authenticate(self.developer)
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.force_authenticate(self.manager)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn("ETag", response)
+
+    def test_member_change_invalidates_project_etag(self):
+        url = reverse("project-detail", args=[self.project.id])
+        etag = self.client.get(url)["ETag"]
+        self.project.team_members.add(self.developer)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProjectExportTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.task = self.make_task(self.project, title="Exported")
+        self.comment = Comments.objects.create(
+            text="Hello, world", author=self.manager, task=self.task, project=self.project
+        )
+        self.client.force_authenticate(self.manager)
+        self.url = reverse("project-export", args=[self.project.id])
+
+    def test_csv_export_streams_all_record_types(self):
+        response = self.client.get(self.url, {"format": "csv"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(content.splitlines()))
+        by_type = {}
+        for row in rows:
+            by_type.setdefault(row["record_type"], []).append(row)
+        self.assertEqual(by_type["task"][0]["title"], "Exported")
+        self.assertEqual(by_type["comment"][0]["text"], "Hello, world")
+        self.assertIn("timeline", by_type)
+
+    def test_gzipped_jsonl_export(self):
+        response = self.client.get(self.url, {"format": "jsonl", "compress": "gzip"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertIn(
+            {"record_type": "task", "id": self.task.id},
+            [{"record_type": r["record_type"], "id": r["id"]} for r in records],
+        )
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(self.url, {"format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_member_cannot_export(self):
+        other = self.make_project(self.make_user("other", RoleChoice.MANAGER.name))
+        response = self.client.get(reverse("project-export", args=[other.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportTicketsTestCase(FixtureTestCase):
+    def import_records(self, records, **options):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as source:
+            source.writelines(json.dumps(record) + "\n" for record in records)
+        errors = StringIO()
+        call_command(
+            "import_tickets", source.name, stdout=StringIO(), stderr=errors, **options
+        )
+        Path(source.name).unlink()
+        return errors.getvalue()
+
+    def test_import_resolves_references_and_writes_timeline(self):
+        developer = self.make_user("developer")
+        errors = self.import_records(
+            [
+                {
+                    "type": "project",
+                    "id": "P-1",
+                    "title": "Imported",
+                    "description": "From the old tracker",
+                    "start_date": "2024-01-12",
+                    "team_members": ["developer@company.com"],
+                },
+                {
+                    "type": "task",
+                    "id": "T-1",
+                    "project": "P-1",
+                    "title": "First",
+                    "description": "Imported task",
+                    "status": "WORKING",
+                    "assignee": "developer@company.com",
+                },
+                {
+                    "type": "task",
+                    "id": "T-2",
+                    "project": "P-1",
+                    "title": "Second",
+                    "description": "Imported task",
+                },
+                {
+                    "type": "comment",
+                    "id": "C-1",
+                    "task": "T-1",
+                    "author": "developer@company.com",
+                    "text": "Carried over",
+                },
+            ],
+            batch_size=1,
+        )
+        self.assertEqual(errors, "")
+        project = Project.objects.get(title="Imported")
+        self.assertEqual(list(project.team_members.all()), [developer])
+        task = Task.objects.get(title="First")
+        self.assertEqual((task.project, task.assignee, task.status), (project, developer, "WORKING"))
+        comment = Comments.objects.get()
+        self.assertEqual((comment.task, comment.project), (task, project))
+        self.assertEqual(TimeLine.objects.filter(project=project).count(), 3)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        errors = self.import_records(
+            [
+                {"type": "project", "id": "P-1", "description": "No title", "start_date": "2024-01-12"},
+                {"type": "task", "id": "T-1", "project": "P-1", "title": "Orphan", "description": "x"},
+                {"type": "task", "id": "T-2", "project": "P-9", "title": "Bad", "description": "x", "status": "DONE"},
+            ]
+        )
+        self.assertIn("Line 1:", errors)
+        self.assertIn("Line 2: unknown project 'P-1'", errors)
+        self.assertIn("Line 3:", errors)
+        self.assertFalse(Task.objects.exists())
+
+    def test_missing_required_references_are_reported(self):
+        self.make_user("author")
+        errors = self.import_records(
+            [
+                {"type": "project", "id": "P-1", "title": "Kept", "description": "x", "start_date": "2024-01-12"},
+                {"type": "task", "id": "T-1", "title": "No project", "description": "x"},
+                {"type": "task", "id": "T-2", "project": "P-1", "title": "Kept", "description": "x"},
+                {"type": "comment", "author": "author@company.com", "text": "No task"},
+                {"type": "comment", "task": "T-2", "text": "No author"},
+            ]
+        )
+        self.assertIn("Line 2: missing project", errors)
+        self.assertIn("Line 4: missing task", errors)
+        self.assertIn("Line 5: missing author", errors)
+        self.assertEqual(list(Task.objects.values_list("title", flat=True)), ["Kept"])
+        self.assertFalse(Comments.objects.exists())
+
+
+class MembershipCacheTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager)
+        self.task = self.make_task(self.project)
+
+    def test_visible_ids_are_cached(self):
+        self.assertEqual(visible_project_ids(self.manager), {self.project.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(visible_project_ids(self.manager), {self.project.id})
+
+    def test_adding_and_removing_members_invalidates(self):
+        self.assertEqual(visible_project_ids(self.developer), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.team_members.add(self.developer)
+        self.assertEqual(visible_project_ids(self.developer), {self.project.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.developer.projects.remove(self.project)
+        self.assertEqual(visible_project_ids(self.developer), set())
+
+    def test_invalidation_waits_for_commit(self):
+        visible_project_ids(self.developer)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.project.team_members.add(self.developer)
+            # A request before the commit still sees the old membership,
+            # and must not leave it cached past the commit.
+            self.assertEqual(visible_project_ids(self.developer), set())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(visible_project_ids(self.developer), {self.project.id})
+
+    def test_clear_invalidates_every_member(self):
+        self.project.team_members.add(self.developer)
+        visible_project_ids(self.manager)
+        visible_project_ids(self.developer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.team_members.clear()
+        self.assertIsNone(cache.get(cache_key(self.manager.id)))
+        self.assertEqual(visible_project_ids(self.developer), set())
+
+    def test_task_list_filters_on_visible_projects(self):
+        self.make_task(self.make_project(self.developer, title="Hidden"))
+        self.client.force_authenticate(self.manager)
+        response = self.client.get(reverse("task-list-create"))
+        self.assertEqual(
+            [task["id"] for task in response.data], [self.task.id]
+        )
+
+
+class CommentProjectTestCase(FixtureTestCase):
+    def setUp(self):
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.developer)
+        self.other = self.make_project(self.developer, title="Other")
+        self.task = self.make_task(self.project)
+        self.client.force_authenticate(self.developer)
+
+    def test_project_is_taken_from_task(self):
+        response = self.client.post(
+            reverse("comment-list-create"),
+            {"text": "No project given", "task_id": self.task.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comments.objects.get().project, self.project)
+
+    def test_mismatched_project_is_rejected(self):
+        response = self.client.post(
+            reverse("comment-list-create"),
+            {"text": "Wrong", "task_id": self.task.id, "project_id": self.other.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("project_id", response.data)
+
+    def test_comments_follow_task_to_new_project(self):
+        comment = Comments.objects.create(
+            text="Moving", author=self.developer, task=self.task
+        )
+        moved_at = comment.updated_at
+        self.task.project = self.other
+        self.task.save()
+        comment.refresh_from_db()
+        self.assertEqual(comment.project, self.other)
+        self.assertGreater(comment.updated_at, moved_at)
+
+    def test_migration_repairs_mismatched_comments(self):
+        comment = Comments.objects.create(
+            text="Stale", author=self.developer, task=self.task
+        )
+        Comments.objects.filter(pk=comment.pk).update(project=self.other)
+        migration = importlib.import_module(
+            "ticketapi.migrations.0009_comment_project_from_task"
+        )
+        migration.repair_comment_projects(apps, None)
+        comment.refresh_from_db()
+        self.assertEqual(comment.project, self.project)
+
+
+class UserSummaryCacheTestCase(FixtureTestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.developer)
+        self.task = self.make_task(self.project, assignee=self.developer)
+
+    def test_summaries_are_fetched_once_then_served_from_caches(self):
+        other = self.make_user("other")
+        expected = {
+            self.developer.id: {
+                "id": self.developer.id,
+                "username": "developer",
+                "email": "developer@company.com",
+            },
+            other.id: {"id": other.id, "username": "other", "email": "other@company.com"},
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_summaries([self.developer.id, other.id]), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_summaries([self.developer.id, other.id]), expected)
+        local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_summaries([self.developer.id, other.id]), expected)
+
+    def test_user_save_invalidates_summary(self):
+        get_user_summaries([self.developer.id])
+        self.developer.username = "renamed"
+        self.developer.save()
+        self.assertEqual(
+            get_user_summaries([self.developer.id])[self.developer.id]["username"],
+            "renamed",
+        )
+
+    def test_comment_list_queries_do_not_grow_with_authors(self):
+        self.client.force_authenticate(self.developer)
+        url = reverse("comment-list-create")
+        Comments.objects.create(text="First", author=self.developer, task=self.task)
+        local_cache.clear()
+        cache.clear()
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+        for name in ("second", "third"):
+            author = self.make_user(name)
+            Comments.objects.create(text=name, author=author, task=self.task)
+        local_cache.clear()
+        cache.clear()
+        with self.assertNumQueries(len(single.captured_queries)):
+            response = self.client.get(url)
+        self.assertEqual(
+            sorted(comment["author"]["username"] for comment in response.data),
+            ["developer", "second", "third"],
+        )
+
+
+class ProjectMemberListTestCase(FixtureTestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.client.force_authenticate(self.manager)
+
+    def test_list_renders_members_without_loading_users(self):
+        developers = [self.make_user(f"developer{i}") for i in range(3)]
+        self.project.team_members.add(*developers)
+        response = self.client.get(reverse("project-list-create"))
+        self.assertEqual(
+            sorted(member["username"] for member in response.data[0]["team_members"]),
+            ["developer0", "developer1", "developer2", "manager"],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("project-list-create"))
+        self.assertFalse(
+            any("api_customuser" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_member_changes_rebuild_the_list(self):
+        developer = self.make_user("developer")
+        self.assertEqual(project_member_lists([self.project.id]), {self.project.id: [self.manager.id]})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.team_members.add(developer)
+        self.assertEqual(
+            project_member_lists([self.project.id]),
+            {self.project.id: [self.manager.id, developer.id]},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            developer.projects.clear()
+        self.assertEqual(project_member_lists([self.project.id]), {self.project.id: [self.manager.id]})
+
+
+class AssignTaskTestCase(FixtureTestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager, self.developer)
+        self.task = self.make_task(self.project)
+        self.client.force_authenticate(self.manager)
+        self.url = reverse("assign-task", args=[self.task.id])
+
+    def test_assignment_keeps_concurrent_edits(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        Task.objects.filter(pk=self.task.pk).update(title="Edited meanwhile")
+        response = self.client.post(self.url, {"assignee_id": self.developer.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stale.refresh_from_db()
+        self.assertEqual((stale.title, stale.assignee), ("Edited meanwhile", self.developer))
+        self.assertTrue(Notification.objects.filter(user=self.developer).exists())
+
+    def test_query_count_is_fixed(self):
+        other = self.make_user("other")
+        get_user_summaries([self.developer.id, other.id])
+        visible_project_ids(self.manager)
+        with CaptureQueriesContext(connection) as first:
+            self.client.post(self.url, {"assignee_id": self.developer.id})
+        with self.assertNumQueries(len(first.captured_queries)):
+            self.client.post(self.url, {"assignee_id": other.id})
+        self.assertLessEqual(len(first.captured_queries), 10)
+
+    def test_repeated_assignment_writes_nothing(self):
+        self.client.post(self.url, {"assignee_id": self.developer.id})
+        events = TimeLine.objects.count()
+        response = self.client.post(self.url, {"assignee_id": self.developer.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(TimeLine.objects.count(), events)
+        self.assertEqual(Notification.objects.get(user=self.developer).count, 1)
+
+    def test_unknown_task_is_404(self):
+        response = self.client.post(
+            reverse("assign-task", args=[0]), {"assignee_id": self.developer.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskWorkflowTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.qa = self.make_user("qa", RoleChoice.QA.name)
+        self.project = self.make_project(self.manager, self.developer, self.qa)
+        self.task = self.make_task(self.project)
+
+    def transition(self, user, *moves):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse("task-transitions"),
+            {"transitions": [{"task_id": task.id, "status": target} for task, target in moves]},
+            format="json",
+        )
+
+    def test_table_and_status_normalization(self):
+        self.assertIn(RoleChoice.QA.name, TRANSITIONS[("WAITING_QA", "AWAITING_RELEASE")])
+        self.assertNotIn(("OPEN", "CLOSED"), TRANSITIONS)
+        self.assertEqual(normalize_status("waiting_qa"), "WAITING_QA")
+        self.assertIsNone(normalize_status("done"))
+
+    def test_new_tasks_start_open(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.post(
+            reverse("task-list-create"),
+            {"title": "Done", "description": "x", "project_id": self.project.id, "status": "CLOSED"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("status", response.data)
+
+    def test_accounts_without_profile_are_forbidden(self):
+        admin = User.objects.create(email="root@company.com", username="root", is_superuser=True)
+        self.client.force_authenticate(admin)
+        response = self.client.patch(
+            reverse("task-detail", args=[self.task.id]), {"status": "WORKING"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.transition(admin, (self.task, "WORKING"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_manager_cannot_skip_the_workflow(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.patch(
+            reverse("task-detail", args=[self.task.id]), {"status": "CLOSED"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("status", response.data)
+
+    def test_bulk_transitions_are_validated_as_a_set(self):
+        second = self.make_task(self.project, title="Second")
+        response = self.transition(self.developer, (self.task, "WORKING"), (second, "CLOSED"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data["transitions"]), [second.id])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "OPEN")
+
+        response = self.transition(self.developer, (self.task, "WORKING"), (second, "WORKING"))
+        self.assertEqual(response.data["moved"], sorted([self.task.id, second.id]))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "WORKING")
+        self.assertEqual(
+            list(TaskTransition.objects.filter(task=self.task).values_list("from_status", "to_status", "actor")),
+            [(0, 1, self.developer.id)],
+        )
+        self.assertTrue(
+            TimeLine.objects.filter(target_id=second.id, changes__status=["OPEN", "WORKING"]).exists()
+        )
+
+    def test_roles_limit_transitions(self):
+        self.transition(self.developer, (self.task, "WORKING"))
+        self.transition(self.developer, (self.task, "REVIEW"))
+        response = self.transition(self.developer, (self.task, "WAITING_QA"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.transition(self.qa, (self.task, "WAITING_QA"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tasks_outside_visible_projects_are_not_found(self):
+        hidden = self.make_task(self.make_project(self.manager, title="Hidden"))
+        response = self.transition(self.developer, (hidden, "WORKING"))
+        self.assertEqual(response.data["transitions"][hidden.id], "Task not found.")
+
+
+class TaskMetricsTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager, self.developer)
+        self.start = timezone.now() - timedelta(days=30)
+
+    def history(self, task, *steps):
+        """Transitions of `task` as (status code, hours after start)"""
+        for code, hours in steps:
+            transition = TaskTransition.objects.create(task=task, to_status=code)
+            TaskTransition.objects.filter(pk=transition.pk).update(
+                changed_at=self.start + timedelta(hours=hours)
+            )
+
+    def test_chunking_does_not_change_results(self):
+        columns = {
+            "project": [1, 1, 1, 1, 1, 1],
+            "task": [10, 10, 10, 11, 11, 11],
+            "status": [0, 1, 5, 0, 1, 5],
+            "at": [0, HOUR, DAY, 0, 2 * HOUR, 2 * DAY],
+            "assignee": [7, 7, 7, 0, 0, 0],
+        }
+        results = []
+        for size in (1, 2, 6):
+            accumulator = TaskMetricsAccumulator()
+            for start in range(0, 6, size):
+                accumulator.add(
+                    {name: np.array(values[start : start + size]) for name, values in columns.items()}
+                )
+            results.append(accumulator.results())
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        lead = next(row for row in results[0] if row["kind"] == "LEAD_TIME")
+        self.assertEqual((lead["count"], lead["p50"]), (2, 1.5 * DAY))
+        working = next(row for row in results[0] if row["kind"] == "CYCLE_TIME" and row["status"] == 1)
+        self.assertEqual(working["count"], 2)
+
+    def test_command_stores_metrics_served_by_endpoint(self):
+        task = self.make_task(self.project, assignee=self.developer)
+        self.history(task, (0, 0), (1, 2), (2, 10), (3, 12), (4, 20), (5, 48))
+        call_command("compute_task_metrics", chunk_size=4, stdout=StringIO())
+
+        self.client.force_authenticate(self.manager)
+        response = self.client.get(reverse("project-task-metrics", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = response.data["metrics"]
+        lead = next(row for row in metrics if row["kind"] == "LEAD_TIME")
+        self.assertEqual(lead["p50"], 48 * HOUR)
+        self.assertEqual(
+            {row["status"]: row["p50"] for row in metrics if row["kind"] == "CYCLE_TIME"},
+            {"OPEN": 2 * HOUR, "WORKING": 8 * HOUR, "REVIEW": 2 * HOUR,
+             "WAITING_QA": 8 * HOUR, "AWAITING_RELEASE": 28 * HOUR},
+        )
+        throughput = next(row for row in metrics if row["kind"] == "THROUGHPUT")
+        self.assertEqual((throughput["count"], throughput["assignee"]["id"]), (1, self.developer.id))
+        self.assertEqual(date.fromisoformat(throughput["week"]).weekday(), 0)
+
+    def test_non_member_gets_404(self):
+        other = self.make_user("other", RoleChoice.MANAGER.name)
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse("project-task-metrics", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NotificationCoalescingTestCase(FixtureTestCase):
+    def setUp(self):
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager, self.developer)
+        self.task = self.make_task(self.project, assignee=self.developer)
+
+    def comment(self, task=None):
+        return Comments.objects.create(
+            text="Ping", author=self.manager, task=task or self.task
+        )
+
+    def test_saves_without_reassignment_do_not_notify(self):
+        for number in range(20):
+            self.task.title = f"Edit {number}"
+            self.task.save()
+        self.assertEqual(Notification.objects.filter(user=self.developer).count(), 1)
+
+    def test_repeated_comments_update_one_row(self):
+        for _ in range(5):
+            self.comment()
+        notification = Notification.objects.get(kind="COMMENT")
+        self.assertEqual(notification.count, 5)
+        self.assertEqual(notification.text, "5 new comments on task 'Task'")
+
+    def test_polling_since_sees_coalesced_updates(self):
+        self.comment()
+        other = self.make_task(self.project, assignee=self.developer, title="Other")
+        self.comment(other)
+        last_poll = timezone.now()
+        self.comment()
+
+        self.client.force_authenticate(self.developer)
+        response = self.client.get(
+            reverse("notification-list"), {"since": last_poll.isoformat()}
+        )
+        self.assertEqual(
+            [notification["text"] for notification in response.data],
+            ["2 new comments on task 'Task'"],
+        )
+
+    def test_read_or_old_notifications_are_not_reused(self):
+        self.comment()
+        Notification.objects.filter(kind="COMMENT").update(mark_read=True)
+        self.comment()
+        Notification.objects.filter(kind="COMMENT", mark_read=False).update(
+            created_at=timezone.now() - timedelta(hours=2)
+        )
+        self.comment()
+        self.assertEqual(Notification.objects.filter(kind="COMMENT").count(), 3)
+
+    @override_settings(NOTIFICATIONS={"DIGEST": True, "DIGEST_SECONDS": 86400})
+    def test_digest_mode_shares_a_row_across_tasks(self):
+        other = self.make_task(self.project, assignee=self.developer, title="Other")
+        self.comment()
+        self.comment(other)
+        self.comment(other)
+        notification = Notification.objects.get(kind="COMMENT")
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(notification.task, other)
+        self.assertEqual(notification.text, "3 new comments on your tasks")
+
+
+class WebhookReceiver(BaseHTTPRequestHandler):
+    """Local stand-in for a webhook endpoint, answering with `server.status`"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class WebhookDeliveryTestCase(FixtureTestCase):
+    def setUp(self):
+        cache.clear()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookReceiver)
+        self.server.received = []
+        self.server.status = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.subscription = WebhookSubscription.objects.create(
+            project=self.project,
+            url=f"http://127.0.0.1:{self.server.server_port}/hook",
+            secret="s" * 32,
+        )
+        self.config = {
+            **get_config(),
+            "BACKOFF_BASE": 30,
+            "MAX_ATTEMPTS": 2,
+            "ALLOWED_NETWORKS": ["127.0.0.0/8"],
+        }
+
+    def deliver(self):
+        with WebhookSender(self.config) as sender:
+            return deliver_pending(sender, self.config)
+
+    def test_events_are_batched_and_signed(self):
+        task = self.make_task(self.project)
+        task.title = "Renamed"
+        task.save()
+        self.assertEqual(self.deliver(), (2, 0))
+
+        (headers, body), = self.server.received
+        timestamp = headers["X-Webhook-Timestamp"]
+        expected = hmac.new(
+            b"s" * 32, f"{timestamp}.".encode() + body, hashlib.sha256
+        ).hexdigest()
+        self.assertEqual(headers["X-Webhook-Signature"], f"sha256={expected}")
+        deliveries = json.loads(body)["deliveries"]
+        self.assertEqual([item["event"] for item in deliveries], ["task.created", "task.updated"])
+        self.assertEqual(deliveries[1]["changes"], {"title": ["Task", "Renamed"]})
+        self.assertFalse(WebhookDelivery.objects.exclude(status="DELIVERED").exists())
+
+    def test_bulk_transitions_enqueue_task_updates(self):
+        tasks = [self.make_task(self.project, title=f"Task {i}") for i in range(2)]
+        WebhookDelivery.objects.all().delete()
+        self.client.force_authenticate(self.manager)
+        self.client.post(
+            reverse("task-transitions"),
+            {"transitions": [{"task_id": task.id, "status": "WORKING"} for task in tasks]},
+            format="json",
+        )
+        deliveries = WebhookDelivery.objects.order_by("payload__data__id")
+        self.assertEqual(
+            [(item.event, item.payload["data"]["id"], item.payload["changes"]) for item in deliveries],
+            [("task.updated", task.id, {"status": ["OPEN", "WORKING"]}) for task in tasks],
+        )
+
+    def test_internal_addresses_are_not_called(self):
+        self.config["ALLOWED_NETWORKS"] = []
+        self.make_task(self.project)
+        self.assertEqual(self.deliver(), (0, 1))
+        self.assertEqual(self.server.received, [])
+        self.assertEqual(WebhookDelivery.objects.get().last_error, "127.0.0.1 is not a public address.")
+
+    def test_lease_covers_the_batch_and_stale_results_are_ignored(self):
+        for i in range(3):
+            WebhookSubscription.objects.create(
+                project=self.project, url=f"http://127.0.0.1:1/{i}", secret="s" * 32
+            )
+        self.make_task(self.project)
+        config = {**self.config, "CONCURRENCY": 2, "TIMEOUT": 10}
+        claimed = claim_batch(config)
+        self.assertEqual(len(claimed), 4)
+        # Four subscriptions in two rounds, plus one round of slack.
+        self.assertGreater(claimed[0].next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+        # The lease ran out and another worker claimed the rows again.
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        claim_batch(config)
+        self.assertEqual(record_results([(claimed, "HTTP 500")], config), (0, 0))
+        self.assertFalse(WebhookDelivery.objects.filter(attempts__gt=0).exists())
+
+    def test_failures_back_off_then_give_up(self):
+        self.server.status = 500
+        self.make_task(self.project)
+        self.assertEqual(self.deliver(), (0, 1))
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), ("PENDING", 1))
+        self.assertGreater(delivery.next_attempt_at, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(delivery.last_error, "HTTP 500")
+
+        self.assertEqual(self.deliver(), (0, 0))
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        self.deliver()
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), ("FAILED", 2))
+
+    def test_event_filter_and_inactive_subscriptions(self):
+        self.subscription.events = ["comment.created"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.save()
+        self.make_task(self.project)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+        self.subscription.events = []
+        self.subscription.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.save()
+        self.make_task(self.project)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    def test_writes_survive_a_deleted_subscription_in_the_cache(self):
+        other = WebhookSubscription.objects.create(
+            project=self.project, url="http://127.0.0.1:1/other", secret="s" * 32
+        )
+        task = self.make_task(self.project)
+        key = subscriptions_cache_key(self.project.id)
+        self.assertEqual(len(cache.get(key)), 2)
+
+        # The cache is only cleared once the deletion commits.
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.subscription.delete()
+        self.assertIsNotNone(cache.get(key))
+
+        WebhookDelivery.objects.all().delete()
+        self.client.force_authenticate(self.manager)
+        response = self.client.patch(
+            reverse("task-detail", args=[task.id]), {"title": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(WebhookDelivery.objects.values_list("subscription_id", flat=True)),
+            [other.id],
+        )
+
+        cache.set(key, [(self.subscription.id, [])])
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(key))
+
+    def test_changes_roll_back_with_a_failed_receiver(self):
+        task = self.make_task(self.project)
+
+        def fail(**kwargs):
+            raise RuntimeError("receiver failed")
+
+        post_save.connect(fail, sender=Task)
+        self.addCleanup(post_save.disconnect, fail, sender=Task)
+        self.client.force_authenticate(self.manager)
+        with self.assertRaises(RuntimeError):
+            self.client.patch(
+                reverse("task-detail", args=[task.id]), {"title": "Renamed"}, format="json"
+            )
+        task.refresh_from_db()
+        self.assertEqual(task.title, "Task")
+
+    def test_managers_manage_subscriptions_of_their_projects(self):
+        self.client.force_authenticate(self.manager)
+        url = reverse("project-webhooks", args=[self.project.id])
+        response = self.client.post(
+            url, {"url": "https://ci.example.com/hook", "events": ["task.updated"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["secret"]), 64)
+        self.assertNotIn("secret", self.client.get(url).data[0])
+
+        outsider = self.make_user("outsider", RoleChoice.MANAGER.name)
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_subscriptions_to_internal_addresses_are_rejected(self):
+        self.client.force_authenticate(self.manager)
+        url = reverse("project-webhooks", args=[self.project.id])
+        for target in [
+            "http://127.0.0.1:8000/hook",
+            "http://localhost/hook",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://10.0.0.5/hook",
+            "http://[::1]/hook",
+            "ftp://ci.example.com/hook",
+        ]:
+            response = self.client.post(url, {"url": target})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, target)
+            self.assertIn("url", response.data)
+
+
+THROTTLED = {
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "rest_framework_simplejwt.authentication.JWTAuthentication",
+    ),
+    "DEFAULT_THROTTLE_RATES": {"comments.user": "3/min", "comments.project": "4/min"},
+}
+
+
+@override_settings(REST_FRAMEWORK=THROTTLED)
+class WriteThrottleTestCase(FixtureTestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.developer = self.make_user("developer")
+        self.project = self.make_project(self.manager, self.developer)
+        self.task = self.make_task(self.project)
+        self.url = reverse("comment-list-create")
+
+    def comment(self, user, **data):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            self.url,
+            {"text": "Ping", "task_id": self.task.id, "project_id": self.project.id}
+            | data,
+        )
+
+    def test_user_quota_is_reported_and_enforced(self):
+        remaining = [self.comment(self.manager)["X-RateLimit-Remaining"] for _ in range(3)]
+        self.assertEqual(remaining, ["2", "1", "0"])
+
+        response = self.comment(self.manager)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["X-RateLimit-Scope"], "comments.user")
+        self.assertIn("Retry-After", response)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_project_quota_is_shared_by_members(self):
+        for user in (self.manager, self.manager, self.developer, self.developer):
+            self.assertEqual(self.comment(user).status_code, status.HTTP_201_CREATED)
+        response = self.comment(self.developer)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["X-RateLimit-Scope"], "comments.project")
+
+    def test_project_is_taken_from_the_task(self):
+        for user in (self.manager, self.manager, self.developer, self.developer):
+            response = self.comment(user, project_id="")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.comment(self.developer, project_id="")
+        self.assertEqual(response["X-RateLimit-Scope"], "comments.project")
+
+    def test_outsiders_cannot_spend_project_quota(self):
+        outsiders = [self.make_user("outsider1"), self.make_user("outsider2")]
+        for user in outsiders + outsiders:
+            self.comment(user, task_id="")
+        for user in (self.manager, self.manager, self.developer, self.developer):
+            self.assertEqual(self.comment(user).status_code, status.HTTP_201_CREATED)
+
+    def test_check_does_not_query_the_database(self):
+        request = RequestFactory().post(self.url)
+        request.user = self.manager
+        request.method = "POST"
+        request._request = request
+        with self.assertNumQueries(0):
+            self.assertTrue(UserWriteThrottle.for_scope("comments")().allow_request(request, None))
+
+
+class SoftDeleteTestCase(FixtureTestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.task = self.make_task(self.project)
+        Comments.objects.create(text="Ping", author=self.manager, task=self.task)
+        self.client.force_authenticate(self.manager)
+
+    def test_deleting_a_project_hides_it_without_cascading(self):
+        for number in range(20):
+            self.make_task(self.project, title=f"Task {number}")
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(reverse("project-detail", args=[self.project.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertLessEqual(len(queries), 10)
+
+        self.assertEqual(self.client.get(reverse("project-list-create")).data, [])
+        self.assertEqual(self.client.get(reverse("task-list-create")).data, [])
+        self.assertEqual(Task.all_objects.filter(project=self.project).count(), 21)
+        event = TimeLine.objects.filter(event_type="deleted").get()
+        self.assertEqual((event.target_type, event.target_id), ("PROJECT", self.project.id))
+
+    def test_deleting_a_task_hides_it_and_its_comments(self):
+        response = self.client.delete(reverse("task-detail", args=[self.task.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.client.get(reverse("comment-list-create")).data, [])
+        self.assertTrue(Tombstone.objects.filter(model="TASK", object_id=self.task.id).exists())
+
+    def test_comment_queries_do_not_join_tasks(self):
+        comment = Comments.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("comment-detail", args=[comment.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lookup = next(q["sql"] for q in queries if 'FROM "ticketapi_comments"' in q["sql"])
+        self.assertNotIn('JOIN "ticketapi_task"', lookup)
+
+        self.task.soft_delete()
+        response = self.client.get(reverse("comment-detail", args=[comment.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_purge_removes_dependents_and_files(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            document = Document.objects.create(
+                name="Spec",
+                description="Spec",
+                file=SimpleUploadedFile("spec.txt", b"spec"),
+                project=self.project,
+            )
+            path = Path(document.file.path)
+            other = self.make_project(self.manager, title="Other")
+            kept = self.make_task(other)
+            self.make_task(other, title="Gone").soft_delete()
+            self.project.soft_delete()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("purge_deleted", batch_size=1, stdout=StringIO())
+            self.assertFalse(path.exists())
+
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Comments.objects.exists())
+        self.assertFalse(TimeLine.objects.filter(project_id=self.project.pk).exists())
+        self.assertEqual(list(Task.all_objects.all()), [kept])
+        self.assertEqual(visible_project_ids(self.manager), {other.id})
+
+
+class DocumentDownloadTestCase(FixtureTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.document = Document.objects.create(
+            name="Spec",
+            description="Spec",
+            file=SimpleUploadedFile("spec.txt", b"0123456789"),
+            project=self.project,
+        )
+        self.url = reverse("document-download", args=[self.document.id])
+        self.client.force_authenticate(self.manager)
+
+    def download(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        # response.close() would also close the test's database connection.
+        if getattr(response, "file_to_stream", None):
+            self.addCleanup(response.file_to_stream.close)
+        return response
+
+    def test_members_get_the_file_with_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.download()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_byte_ranges(self):
+        response = self.download(Range="bytes=2-5")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+
+        response = self.download(Range="bytes=-3")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+
+        response = self.download(Range="bytes=10-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_non_members_get_404(self):
+        self.client.force_authenticate(self.make_user("outsider"))
+        self.assertEqual(self.download().status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_transfer_can_be_handed_to_the_web_server(self):
+        with override_settings(DOCUMENT_DOWNLOADS={"BACKEND": "x-accel-redirect"}):
+            response = self.download()
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected/media/{self.document.file.name}"
+        )
+        self.assertEqual(response.content, b"")
+
+
+def minimal_pdf(content):
+    stream = zlib.compress(content)
+    header = f"1 0 obj\n<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n"
+    return b"%PDF-1.4\n" + header.encode() + stream + b"\nendstream\nendobj\n%%EOF\n"
+
+
+class DocumentIndexingTestCase(FixtureTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = Path(media.name)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.manager = self.make_user("manager", RoleChoice.MANAGER.name)
+        self.project = self.make_project(self.manager)
+        self.client.force_authenticate(self.manager)
+
+    def upload(self, filename, content):
+        response = self.client.post(
+            reverse("document-list-create"),
+            {
+                "name": filename,
+                "description": "Upload",
+                "file": SimpleUploadedFile(filename, content),
+                "project_id": self.project.id,
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def search(self, query):
+        response = self.client.get(
+            reverse("project-document-search", args=[self.project.id]), {"q": query}
+        )
+        return [document["id"] for document in response.data]
+
+    def test_text_formats_and_pdf_text_layers(self):
+        (self.media / "notes.md").write_text("# Release *Notes*\n\nCafé [link](x)")
+        (self.media / "rows.csv").write_text("id,title\n1,Straße\n")
+        (self.media / "report.pdf").write_bytes(
+            minimal_pdf(b"BT (Quarterly) Tj [(Reve) 20 (nue) -400 (up)] TJ ET")
+        )
+        self.assertEqual(
+            extract_terms(str(self.media / "notes.md"), 10**6, 100),
+            ["café", "link", "notes", "release"],
+        )
+        self.assertEqual(
+            extract_terms(str(self.media / "rows.csv"), 10**6, 100),
+            ["id", "strasse", "title"],
+        )
+        self.assertEqual(
+            extract_terms(str(self.media / "report.pdf"), 10**6, 100),
+            ["quarterly", "revenue", "up"],
+        )
+
+    def test_uploads_are_queued_and_indexed_in_the_background(self):
+        report = self.upload("report.pdf", minimal_pdf(b"BT (Quarterly revenue) Tj ET"))
+        notes = self.upload("notes.txt", b"Revenue forecast for next quarter")
+        image = self.upload("logo.png", b"\x89PNG")
+        self.assertEqual(
+            set(DocumentIndex.objects.values_list("status", flat=True)), {"PENDING"}
+        )
+        self.assertEqual(self.search("revenue"), [])
+
+        call_command("index_documents", once=True, workers=1, stdout=StringIO())
+        statuses = dict(DocumentIndex.objects.values_list("document_id", "status"))
+        self.assertEqual(
+            statuses, {report: "INDEXED", notes: "INDEXED", image: "UNSUPPORTED"}
+        )
+        self.assertEqual(sorted(self.search("REVENUE")), sorted([report, notes]))
+        self.assertEqual(self.search("quarterly revenue"), [report])
+
+    def test_responses_link_to_the_download_view_only(self):
+        document = self.upload("notes.txt", b"Revenue forecast")
+        data = self.client.get(reverse("document-detail", args=[document])).data
+        self.assertNotIn("file", data)
+        self.assertTrue(
+            data["download_url"].endswith(
+                reverse("document-download", args=[document])
+            )
+        )
+
+    def test_only_file_changes_queue_a_document_again(self):
+        document = self.upload("notes.txt", b"Revenue forecast")
+        call_command("index_documents", once=True, workers=1, stdout=StringIO())
+        url = reverse("document-detail", args=[document])
+
+        self.client.patch(url, {"description": "Renamed"})
+        index = DocumentIndex.objects.get(document_id=document)
+        self.assertEqual(index.status, "INDEXED")
+
+        DocumentIndex.objects.update(attempted_at=timezone.now())
+        self.client.patch(
+            url,
+            {"file": SimpleUploadedFile("notes.txt", b"Budget")},
+            format="multipart",
+        )
+        index.refresh_from_db()
+        self.assertEqual(index.status, "PENDING")
+        self.assertIsNone(index.attempted_at)
+
+    def test_search_is_limited_to_members(self):
+        self.client.force_authenticate(self.make_user("outsider"))
+        response = self.client.get(
+            reverse("project-document-search", args=[self.project.id]), {"q": "x"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# Run in a fresh interpreter: prints the seconds django.setup() took and the
+# modules named on the command line that it imported.
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, sorted(set(sys.argv[1:]) & set(sys.modules))]))
+"""
+DEFERRED_MODULES = [
+    "api.admin",
+    "debug_toolbar",
+    "httpx",
+    "numpy",
+    "prometheus_client",
+    "ticketapi.admin",
+    "ticketapi.views",
+]
+BOOT_SECONDS = 1.0
+
+
+class StartupTestCase(FixtureTestCase):
+    def boot(self):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "core.settings"}
+        env.pop("DEBUG_TOOLBAR", None)
+        result = subprocess.run(
+            [sys.executable, "-c", BOOT_SCRIPT, *DEFERRED_MODULES],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout)
+
+    def test_setup_defers_admin_toolbar_and_heavy_imports(self):
+        boots = [self.boot() for _ in range(3)]
+        self.assertEqual(boots[0][1], [])
+        self.assertLess(min(elapsed for elapsed, _ in boots), BOOT_SECONDS)
+
+    def test_admin_is_registered_when_urls_load(self):
+        staff = self.make_user("staff")
+        staff.is_staff = staff.is_superuser = True
+        staff.save()
+        self.client.force_login(staff)
+        response = self.client.get(reverse("admin:ticketapi_task_changelist"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,166 @@
+import time
+
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .membership import visible_project_ids
+from .models import Task
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """`"60/min"` -> `(60, 60)`: requests allowed per window of seconds"""
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limits writes to a route scope per bucket with a sliding window kept as
+    two cache counters: the count of the previous fixed window, weighted by
+    how much of it still overlaps the sliding window, plus the count of the
+    current one. A check costs two cache round trips.
+
+    Rates come from REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] under
+    `"<scope>.<kind>"`; scopes without a rate are not limited.
+    """
+
+    scope = None
+    kind = None
+
+    @classmethod
+    def for_scope(cls, scope, **attrs):
+        return type(cls.__name__, (cls,), {"scope": scope, **attrs})
+
+    def bucket(self, request, view):
+        """Identifier the requests are counted under, or None to skip"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{self.scope}.{self.kind}")
+        bucket = self.bucket(request, view) if rate else None
+        if bucket is None:
+            return True
+
+        limit, window = parse_rate(rate)
+        index, offset = divmod(time.time(), window)
+        prefix = f"throttle:{self.scope}:{self.kind}:{bucket}:{window}"
+        current_key = f"{prefix}:{int(index)}"
+        previous_key = f"{prefix}:{int(index) - 1}"
+        counts = cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0) * (1 - offset / window)
+
+        if current + previous >= limit:
+            if current >= limit or not previous:
+                self.wait_seconds = window - offset
+            else:
+                # Until enough of the previous window has slid out.
+                share = (limit - current) / counts[previous_key]
+                self.wait_seconds = max(window * (1 - share) - offset, 1)
+            self.record(request, limit, -1, window - offset)
+            return False
+
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            if not cache.add(current_key, 1, 2 * window):
+                cache.incr(current_key)
+        self.record(
+            request, limit, int(limit - current - previous - 1), window - offset
+        )
+        return True
+
+    def record(self, request, limit, remaining, reset):
+        """
+        Keep the tightest quota on the request for RateLimitHeadersMiddleware;
+        a `remaining` of -1 marks the quota that rejected the request.
+        """
+        tightest = getattr(request._request, "rate_limit", None)
+        if tightest is None or remaining < tightest["remaining"]:
+            request._request.rate_limit = {
+                "limit": limit,
+                "remaining": max(remaining, 0),
+                "reset": int(reset) + 1,
+                "scope": f"{self.scope}.{self.kind}",
+            }
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserWriteThrottle(SlidingWindowThrottle):
+    kind = "user"
+
+    def bucket(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class ProjectWriteThrottle(SlidingWindowThrottle):
+    """
+    Counts writes to a project, shared by every member of it. The project
+    is that of the object in the URL, of the `task_id` posted, or else the
+    posted `project_id`, and is only counted if the user can see it, so
+    that nobody can spend another team's quota. Other requests are only
+    limited per user.
+    """
+
+    kind = "project"
+    # Model of the objects named by the route's `pk` URL argument.
+    model = None
+
+    def project_id(self, request, view):
+        pk = getattr(view, "kwargs", {}).get("pk")
+        if pk is not None and self.model is not None:
+            queryset = self.model._base_manager.filter(pk=pk)
+        elif request.data.get("task_id") is not None:
+            queryset = Task.objects.filter(pk=int(request.data["task_id"]))
+        else:
+            return int(request.data.get("project_id"))
+        return queryset.values_list("project_id", flat=True).first()
+
+    def bucket(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        try:
+            project_id = self.project_id(request, view)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if project_id not in visible_project_ids(request.user):
+            return None
+        return project_id
+
+
+def write_throttles(scope, model=None):
+    """
+    Throttle classes limiting a route's writes per user and per project;
+    `model` is that of the objects named by the route's `pk`.
+    """
+    return [
+        UserWriteThrottle.for_scope(scope),
+        ProjectWriteThrottle.for_scope(scope, model=model),
+    ]
+
+
+class RateLimitHeadersMiddleware:
+    """Expose the tightest quota checked for a request as X-RateLimit-* headers"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, "rate_limit", None)
+        if rate_limit is not None:
+            response["X-RateLimit-Limit"] = rate_limit["limit"]
+            response["X-RateLimit-Remaining"] = rate_limit["remaining"]
+            response["X-RateLimit-Reset"] = rate_limit["reset"]
+            response["X-RateLimit-Scope"] = rate_limit["scope"]
+        return response
@@ -1,21 +1,32 @@
 from django.urls import path
 
+from .models import Comments, Document, Task
+from .throttling import write_throttles
 from .views import (
     AssignTaskView,
     CommentDetailView,
     CommentListCreateView,
     DocumentDetailView,
+    DocumentDownloadView,
+    DocumentSearchView,
     DocumentView,
     LoginView,
     LogoutView,
     MarkNotificationReadView,
+    MetricsView,
     NotificationView,
     ProjectDetailView,
+    ProjectExportView,
     ProjectListCreateView,
     RegisterView,
+    SyncView,
     TaskDetailView,
     TaskListCreateView,
+    TaskMetricsView,
+    TaskTransitionView,
     TimeLineListView,
+    WebhookDetailView,
+    WebhookListCreateView,
 )
 
 urlpatterns = [
@@ -24,13 +35,78 @@ urlpatterns = [
     path("logout/", LogoutView.as_view(), name="logout"),
     path("projects/", ProjectListCreateView.as_view(), name="project-list-create"),
     path("projects/<int:pk>/", ProjectDetailView.as_view(), name="project-detail"),
-    path("tasks/", TaskListCreateView.as_view(), name="task-list-create"),
-    path("tasks/<int:pk>/", TaskDetailView.as_view(), name="task-detail"),
-    path("tasks/<int:pk>/assign/", AssignTaskView.as_view(), name="assign-task"),
-    path("documents/", DocumentView.as_view(), name="document-list-create"),
-    path("documents/<int:pk>/", DocumentDetailView.as_view(), name="document-detail"),
-    path("comments/", CommentListCreateView.as_view(), name="comment-list-create"),
-    path("comments/<int:pk>/", CommentDetailView.as_view(), name="comment-detail"),
+    path(
+        "projects/<int:pk>/export/",
+        ProjectExportView.as_view(),
+        name="project-export",
+    ),
+    path(
+        "projects/<int:pk>/metrics/",
+        TaskMetricsView.as_view(),
+        name="project-task-metrics",
+    ),
+    path(
+        "projects/<int:pk>/documents/search/",
+        DocumentSearchView.as_view(),
+        name="project-document-search",
+    ),
+    path(
+        "projects/<int:pk>/webhooks/",
+        WebhookListCreateView.as_view(),
+        name="project-webhooks",
+    ),
+    path("webhooks/<int:pk>/", WebhookDetailView.as_view(), name="webhook-detail"),
+    path(
+        "tasks/",
+        TaskListCreateView.as_view(throttle_classes=write_throttles("tasks", Task)),
+        name="task-list-create",
+    ),
+    path(
+        "tasks/<int:pk>/",
+        TaskDetailView.as_view(throttle_classes=write_throttles("tasks", Task)),
+        name="task-detail",
+    ),
+    path(
+        "tasks/transitions/",
+        TaskTransitionView.as_view(throttle_classes=write_throttles("tasks", Task)),
+        name="task-transitions",
+    ),
+    path(
+        "tasks/<int:pk>/assign/",
+        AssignTaskView.as_view(throttle_classes=write_throttles("tasks", Task)),
+        name="assign-task",
+    ),
+    path(
+        "documents/",
+        DocumentView.as_view(throttle_classes=write_throttles("documents", Document)),
+        name="document-list-create",
+    ),
+    path(
+        "documents/<int:pk>/",
+        DocumentDetailView.as_view(
+            throttle_classes=write_throttles("documents", Document)
+        ),
+        name="document-detail",
+    ),
+    path(
+        "documents/<int:pk>/download/",
+        DocumentDownloadView.as_view(),
+        name="document-download",
+    ),
+    path(
+        "comments/",
+        CommentListCreateView.as_view(
+            throttle_classes=write_throttles("comments", Comments)
+        ),
+        name="comment-list-create",
+    ),
+    path(
+        "comments/<int:pk>/",
+        CommentDetailView.as_view(
+            throttle_classes=write_throttles("comments", Comments)
+        ),
+        name="comment-detail",
+    ),
     path("timeline/", TimeLineListView.as_view(), name="timeline-list"),
     path("notifications/", NotificationView.as_view(), name="notification-list"),
     path(
@@ -38,4 +114,6 @@ urlpatterns = [
         MarkNotificationReadView.as_view(),
         name="mark-notification-read",
     ),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+User = get_user_model()
+
+SUMMARY_FIELDS = ("id", "username", "email")
+
+
+def get_config():
+    config = {"LOCAL_SIZE": 2048, "LOCAL_TTL": 5, "SHARED_TTL": 3600}
+    config.update(getattr(settings, "USER_SUMMARY_CACHE", {}))
+    return config
+
+
+def cache_key(user_id):
+    return f"user-summary:{user_id}"
+
+
+class LocalLRU:
+    """
+    Small thread-safe LRU with a per-entry TTL. The TTL bounds how long a
+    process can serve a summary that another process has invalidated.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = monotonic()
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                expires, value = entry
+                if expires <= now:
+                    del self.entries[key]
+                    continue
+                self.entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, values):
+        expires = monotonic() + self.ttl
+        with self.lock:
+            for key, value in values.items():
+                self.entries[key] = (expires, value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_config = get_config()
+local_cache = LocalLRU(_config["LOCAL_SIZE"], _config["LOCAL_TTL"])
+
+
+def get_user_summaries(user_ids):
+    """
+    `{id: {"id", "username", "email"}}` for the given user ids, looked up in
+    the process-local LRU, then the shared cache, then one database query.
+    Unknown ids are left out.
+    """
+    missing = {user_id for user_id in user_ids if user_id is not None}
+    summaries = local_cache.get_many(missing)
+    missing -= summaries.keys()
+    if not missing:
+        return summaries
+
+    shared = cache.get_many([cache_key(user_id) for user_id in missing])
+    found = {summary["id"]: summary for summary in shared.values()}
+    missing -= found.keys()
+
+    if missing:
+        loaded = {
+            row["id"]: row
+            for row in User.objects.filter(pk__in=missing).values(*SUMMARY_FIELDS)
+        }
+        cache.set_many(
+            {cache_key(user_id): row for user_id, row in loaded.items()},
+            get_config()["SHARED_TTL"],
+        )
+        found.update(loaded)
+
+    local_cache.set_many(found)
+    summaries.update(found)
+    return summaries
+
+
+def get_user_summary(user_id):
+    if user_id is None:
+        return None
+    return get_user_summaries([user_id]).get(user_id)
+
+
+def invalidate_user_summary(user_id):
+    local_cache.delete(user_id)
+    cache.delete(cache_key(user_id))
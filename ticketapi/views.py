@@ -1,14 +1,37 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import generics, permissions, status
+from django.utils import timezone
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Comments, Document, Notification, Project, Task, TimeLine
-from .permissions import IsCommentAuthor, IsManager
+from .downloads import serve_file
+from .enums import SyncModel
+from .export import EXPORT_FORMATS, export_stream
+from .indexing import search_documents
+from .instrumentation import REGISTRY
+from .membership import visible_project_ids
+from .metrics import HISTOGRAM_EDGES
+from .mixins import AtomicWriteMixin, ConditionalObjectMixin
+from .models import (
+    Comments,
+    Document,
+    Notification,
+    Project,
+    Task,
+    TaskMetric,
+    TimeLine,
+    WebhookSubscription,
+)
+from .partitions import retention_cutoff
+from .permissions import HasMetricsToken, IsCommentAuthor, IsManager, user_role
 from .serializers import (
     AssignTaskSerializer,
+    BulkTransitionSerializer,
     CommentsSerializer,
     DocumentSerializer,
     LoginSerializer,
@@ -17,9 +40,13 @@ from .serializers import (
     NotificationSerializer,
     ProjectSerializer,
     RegisterSerializer,
+    TaskMetricSerializer,
     TaskSerializer,
     TimeLineSerializer,
+    WebhookSubscriptionSerializer,
 )
+from .sync import changes_since, decode_cursor, next_cursor
+from .workflow import apply_transitions, validate_transitions
 
 User = get_user_model()
 
@@ -70,22 +97,58 @@ class ProjectListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsManager]
 
     def get_queryset(self):
-        return Project.objects.filter(team_members=self.request.user).prefetch_related(
-            "team_members"
-        )
+        return Project.objects.filter(pk__in=visible_project_ids(self.request.user))
 
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(ConditionalObjectMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated, IsManager]
 
     def get_queryset(self):
-        return Project.objects.filter(team_members=self.request.user).prefetch_related(
-            "team_members", "tasks"
+        return Project.objects.filter(
+            pk__in=visible_project_ids(self.request.user)
+        ).prefetch_related("tasks")
+
+    def perform_destroy(self, instance):
+        # Tasks, comments and documents are removed by `manage.py purge_deleted`.
+        instance.soft_delete()
+
+
+class ProjectExportView(APIView):
+    """
+    Stream every task, comment and timeline event of a project as CSV or
+    JSONL, optionally gzipped, without holding the export in memory.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsManager]
+
+    def perform_content_negotiation(self, request, force=False):
+        # `format` names the export format here, not a renderer.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, pk):
+        if pk not in visible_project_ids(request.user):
+            raise Http404
+        export_format = request.query_params.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise serializers.ValidationError(
+                {"format": f"Choose one of: {', '.join(EXPORT_FORMATS)}."}
+            )
+        compress = request.query_params.get("compress") == "gzip"
+
+        filename = f"project-{pk}.{export_format}"
+        content_type = EXPORT_FORMATS[export_format]
+        if compress:
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(
+            export_stream(pk, export_format, compress), content_type=content_type
         )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
 
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(AtomicWriteMixin, generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     # permission_classes = [IsManager]
 
@@ -105,22 +168,25 @@ class TaskListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         project_id = self.request.query_params.get("project_id")
-        queryset = Task.objects.filter(project__team_members=user)
+        queryset = Task.objects.filter(project_id__in=visible_project_ids(user))
         if project_id:
             queryset = queryset.filter(project_id=project_id)
-        return queryset.select_related("project", "assignee").prefetch_related(
-            "project__team_members", "comments"
-        )
+        return queryset.select_related("project").prefetch_related("comments")
 
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(
+    AtomicWriteMixin, ConditionalObjectMixin, generics.RetrieveUpdateDestroyAPIView
+):
     serializer_class = TaskSerializer
     permission_classes = [IsManager]
 
     def get_queryset(self):
         return Task.objects.filter(
-            project__team_members=self.request.user
-        ).select_related("project", "assignee")
+            project_id__in=visible_project_ids(self.request.user)
+        ).select_related("project")
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
 
 
 class AssignTaskView(APIView):
@@ -128,25 +194,127 @@ class AssignTaskView(APIView):
     serializer_class = AssignTaskSerializer
 
     def post(self, request, pk):
-        task = get_object_or_404(Task, id=pk)
         serializer = self.serializer_class(data=request.data)
-
-        if serializer.is_valid(raise_exception=True):
-            assignee_id = serializer.validated_data["assignee_id"]
-            assignee = get_object_or_404(User, id=assignee_id)
+        serializer.is_valid(raise_exception=True)
+        # The serializer field has already loaded the user.
+        assignee = serializer.validated_data["assignee_id"]
+
+        # Lock the row so that concurrent reassignments serialize, and write
+        # only the assignee so that other concurrent edits are kept. The
+        # timeline and notification rows commit in the same transaction.
+        with transaction.atomic():
+            task = get_object_or_404(
+                Task.objects.select_for_update(of=("self",)).select_related("project"),
+                id=pk,
+            )
             task.assignee = assignee
-            task.save()
+            task.save(update_fields=["assignee", "updated_at"])
 
-            return Response(
-                {
-                    "message": f"Task '{task.title}' assigned to {assignee.email}",
-                    "task": TaskSerializer(task).data,
-                },
-                status=status.HTTP_200_OK,
+        return Response(
+            {
+                "message": f"Task '{task.title}' assigned to {assignee.email}",
+                "task": TaskSerializer(task).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class TaskTransitionView(APIView):
+    """
+    Move several tasks to new statuses at once. The whole set is checked
+    against the workflow first and nothing is changed if any task may not
+    make its transition.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkTransitionSerializer
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        targets = {
+            item["task_id"]: item["status"]
+            for item in serializer.validated_data["transitions"]
+        }
+        role = user_role(request.user)
+
+        with transaction.atomic():
+            tasks = (
+                Task.objects.select_for_update()
+                .filter(project_id__in=visible_project_ids(request.user))
+                .in_bulk(list(targets))
             )
+            errors = validate_transitions(role, tasks, targets)
+            if errors:
+                raise serializers.ValidationError({"transitions": errors})
+            moved = apply_transitions(tasks, targets, request.user)
+
+        return Response(
+            {"moved": sorted(task.pk for task in moved)}, status=status.HTTP_200_OK
+        )
+
+
+class TaskMetricsView(APIView):
+    """
+    Lead time, time in status and weekly throughput of a project, as last
+    computed by `manage.py compute_task_metrics`. Durations are in seconds.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsManager]
+
+    def get(self, request, pk):
+        if pk not in visible_project_ids(request.user):
+            raise Http404
+        metrics = TaskMetric.objects.filter(project_id=pk).order_by(
+            "kind", "status", "week", "assignee_id"
+        )
+        computed_at = metrics.values_list("computed_at", flat=True).first()
+        return Response(
+            {
+                "project": pk,
+                "computed_at": computed_at,
+                "histogram_edges": [
+                    None if edge == float("inf") else int(edge)
+                    for edge in HISTOGRAM_EDGES
+                ],
+                "metrics": TaskMetricSerializer(metrics, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class WebhookListCreateView(generics.ListCreateAPIView):
+    """
+    Webhook subscriptions of a project. Task, comment and document events
+    are posted to each subscribed URL by `manage.py deliver_webhooks`.
+    """
+
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsManager]
+
+    def get_project_id(self):
+        if self.kwargs["pk"] not in visible_project_ids(self.request.user):
+            raise Http404
+        return self.kwargs["pk"]
+
+    def get_queryset(self):
+        return WebhookSubscription.objects.filter(project_id=self.get_project_id())
 
+    def perform_create(self, serializer):
+        serializer.save(project_id=self.get_project_id(), created_by=self.request.user)
+
+
+class WebhookDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsManager]
 
-class DocumentView(generics.ListCreateAPIView):
+    def get_queryset(self):
+        return WebhookSubscription.objects.filter(
+            project_id__in=visible_project_ids(self.request.user)
+        )
+
+
+class DocumentView(AtomicWriteMixin, generics.ListCreateAPIView):
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -154,26 +322,73 @@ class DocumentView(generics.ListCreateAPIView):
         user = self.request.user
         project_id = self.request.query_params.get("project_id")
 
-        queryset = Document.objects.filter(project__team_members=user).select_related(
-            "project"
-        )
+        queryset = Document.objects.filter(
+            project_id__in=visible_project_ids(user)
+        ).select_related("project")
 
         if project_id:
             queryset = queryset.filter(project_id=project_id)
         return queryset
 
 
-class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DocumentDetailView(
+    AtomicWriteMixin, ConditionalObjectMixin, generics.RetrieveUpdateDestroyAPIView
+):
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return Document.objects.filter(
-            project__team_members=self.request.user
+            project_id__in=visible_project_ids(self.request.user)
         ).select_related("project")
 
 
-class CommentListCreateView(generics.ListCreateAPIView):
+class DocumentSearchView(generics.ListAPIView):
+    """
+    Documents of a project whose file contains every word of `?q=`, as
+    indexed by `manage.py index_documents`.
+    """
+
+    serializer_class = DocumentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.kwargs["pk"] not in visible_project_ids(self.request.user):
+            raise Http404
+        query = self.request.query_params.get("q", "")
+        return search_documents(self.kwargs["pk"], query).order_by("-updated_at")[:50]
+
+
+class DocumentDownloadView(APIView):
+    """
+    Send a document's file to members of its project. Membership is checked
+    in the same indexed query that reads the file name; the transfer itself
+    is handed to the front-end server when DOCUMENT_DOWNLOADS["BACKEND"]
+    allows it.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Any Accept header is fine; the response is the file itself.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, pk):
+        name = (
+            Document.objects.filter(
+                pk=pk,
+                project__team_members=request.user,
+                project__deleted_at__isnull=True,
+            )
+            .values_list("file", flat=True)
+            .first()
+        )
+        if not name:
+            raise Http404
+        return serve_file(request, name, Document._meta.get_field("file").storage)
+
+
+class CommentListCreateView(AtomicWriteMixin, generics.ListCreateAPIView):
     serializer_class = CommentsSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -183,8 +398,8 @@ class CommentListCreateView(generics.ListCreateAPIView):
         project_id = self.request.query_params.get("project_id")
 
         queryset = Comments.objects.filter(
-            task__project__team_members=user
-        ).select_related("author", "task", "project")
+            project_id__in=visible_project_ids(user), deleted_at__isnull=True
+        ).select_related("task", "project")
 
         if task_id:
             queryset = queryset.filter(task_id=task_id)
@@ -194,12 +409,18 @@ class CommentListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetailView(
+    AtomicWriteMixin, ConditionalObjectMixin, generics.RetrieveUpdateDestroyAPIView
+):
     serializer_class = CommentsSerializer
     permission_classes = [permissions.IsAuthenticated, IsCommentAuthor]
+    version_fields = ["author"]
 
     def get_queryset(self):
-        return Comments.objects.filter(task__project__team_members=self.request.user)
+        return Comments.objects.filter(
+            project_id__in=visible_project_ids(self.request.user),
+            deleted_at__isnull=True,
+        )
 
 
 class TimeLineListView(generics.ListAPIView):
@@ -210,12 +431,18 @@ class TimeLineListView(generics.ListAPIView):
         user = self.request.user
         project_id = self.request.query_params.get("project_id")
 
-        queryset = TimeLine.objects.filter(project__team_members=user).select_related(
-            "project"
-        )
+        # Bounding `time` lets PostgreSQL skip partitions outside the window.
+        queryset = TimeLine.objects.filter(
+            project_id__in=visible_project_ids(user), time__gte=retention_cutoff()
+        ).select_related("project")
 
         if project_id:
             queryset = queryset.filter(project_id=project_id)
+        since = self.request.query_params.get("since")
+        if since:
+            queryset = queryset.filter(
+                time__gte=serializers.DateTimeField().to_internal_value(since)
+            )
 
         return queryset.order_by("-time")
 
@@ -225,11 +452,18 @@ class NotificationView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return (
-            Notification.objects.filter(user=self.request.user)
-            .select_related("user")
-            .order_by("-created_at")
+        # Bounding `created_at` lets PostgreSQL skip partitions outside the
+        # window. Coalescing updates older rows, so `since` and the order
+        # go by `updated_at`.
+        queryset = Notification.objects.filter(
+            user=self.request.user, created_at__gte=retention_cutoff()
         )
+        since = self.request.query_params.get("since")
+        if since:
+            queryset = queryset.filter(
+                updated_at__gte=serializers.DateTimeField().to_internal_value(since)
+            )
+        return queryset.order_by("-updated_at")
 
 
 class MarkNotificationReadView(APIView):
@@ -240,8 +474,10 @@ class MarkNotificationReadView(APIView):
         serializer = MarkNotificationReadSerializer(data=request.data)
 
         if serializer.is_valid(raise_exception=True):
-            notification.mark_read = serializer.validated_data["mark_read"]
-            notification.save()
+            mark_read = serializer.validated_data["mark_read"]
+            if notification.mark_read != mark_read:
+                notification.mark_read = mark_read
+                notification.save(update_fields=["mark_read", "updated_at"])
 
             return Response(
                 {
@@ -250,3 +486,46 @@ class MarkNotificationReadView(APIView):
                 },
                 status=status.HTTP_200_OK,
             )
+
+
+class SyncView(APIView):
+    """
+    Tasks, comments and documents changed since the `since` cursor, plus
+    the ids of deleted ones and of projects the user lost access to, whose
+    objects are to be dropped. Without a cursor everything visible is sent.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        started_at = timezone.now()
+        since = request.query_params.get("since")
+        tasks, comments, documents, tombstones, removed_projects = changes_since(
+            request.user, decode_cursor(since) if since else None
+        )
+
+        deleted = {tag.value: [] for tag in SyncModel}
+        for model, object_id in tombstones:
+            deleted[SyncModel[model].value].append(object_id)
+        deleted["project"] = list(removed_projects)
+
+        return Response(
+            {
+                "cursor": next_cursor(started_at),
+                "tasks": TaskSerializer(tasks, many=True).data,
+                "comments": CommentsSerializer(comments, many=True).data,
+                "documents": DocumentSerializer(
+                    documents, many=True, context={"request": request}
+                ).data,
+                "deleted": deleted,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(generate_latest(REGISTRY), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,380 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .enums import EventType, SyncModel, WebhookStatus
+from .models import WebhookDelivery, WebhookSubscription
+
+# "task.created", "comment.deleted", ...
+WEBHOOK_EVENTS = [
+    f"{model.value}.{event.value}" for model in SyncModel for event in EventType
+]
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+
+
+def get_config():
+    config = {
+        "BATCH_SIZE": 100,
+        "CONCURRENCY": 10,
+        "TIMEOUT": 10,
+        "MAX_ATTEMPTS": 8,
+        "BACKOFF_BASE": 30,
+        "BACKOFF_MAX": 6 * 3600,
+        "POLL_SECONDS": 5,
+        "SUBSCRIPTION_CACHE_SECONDS": 300,
+        "ALLOWED_NETWORKS": [],
+    }
+    config.update(getattr(settings, "WEBHOOKS", {}))
+    return config
+
+
+def check_url(url, config, resolve=True):
+    """
+    Raise ValueError unless `url` is http(s) and its host is, or resolves
+    to, public addresses only. Private, loopback, link-local and reserved
+    targets are refused unless they are in ALLOWED_NETWORKS, so that a
+    subscription cannot make the worker call internal services. With
+    `resolve` false, a host name that does not resolve is let through.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Webhook URLs must use http or https.")
+    try:
+        addresses = {
+            info[4][0]
+            for info in socket.getaddrinfo(
+                parts.hostname, parts.port or 443, type=socket.SOCK_STREAM
+            )
+        }
+    except (socket.gaierror, UnicodeError, ValueError):
+        if resolve:
+            raise ValueError(f"Cannot resolve {parts.hostname}.")
+        return
+    allowed = [ipaddress.ip_network(network) for network in config["ALLOWED_NETWORKS"]]
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global and not any(ip in network for network in allowed):
+            raise ValueError(f"{parts.hostname} is not a public address.")
+
+
+def subscriptions_cache_key(project_id):
+    return f"webhook-subscriptions:{project_id}"
+
+
+def project_subscriptions(project_id):
+    """`[(subscription id, events)]` of a project's active subscriptions, cached"""
+    key = subscriptions_cache_key(project_id)
+    subscriptions = cache.get(key)
+    if subscriptions is None:
+        subscriptions = list(
+            WebhookSubscription.objects.filter(
+                project_id=project_id, is_active=True
+            ).values_list("id", "events")
+        )
+        cache.set(key, subscriptions, get_config()["SUBSCRIPTION_CACHE_SECONDS"])
+    return subscriptions
+
+
+def invalidate_project_subscriptions(project_id):
+    cache.delete(subscriptions_cache_key(project_id))
+
+
+def json_value(value):
+    """`value` with files given by their stored name"""
+    return value.name if isinstance(value, FieldFile) else value
+
+
+def object_data(instance):
+    """Column values of `instance`, with files given by their stored name"""
+    return {
+        field.attname: json_value(getattr(instance, field.attname))
+        for field in instance._meta.concrete_fields
+    }
+
+
+def enqueue_event(model, event_type, instance, changes=None):
+    """
+    Queue an event about `instance` for every subscription of its project.
+    Called from signal receivers; the API write views run in a transaction,
+    so there the rows commit or roll back together with the change itself.
+    """
+    return enqueue_events(model, event_type, [(instance, changes)])
+
+
+def enqueue_events(model, event_type, changed):
+    """
+    Queue the events of `(instance, changes)` pairs with one insert and
+    return how many deliveries were queued.
+
+    The subscription ids come from the cache, which may still list one that
+    was just deleted or deactivated, so the rows are inserted with a join on
+    the live subscriptions rather than from the ids alone.
+    """
+    event = f"{model.value}.{event_type.value}"
+    subscription_ids, payloads = [], []
+    for instance, changes in changed:
+        matching = [
+            subscription_id
+            for subscription_id, events in project_subscriptions(instance.project_id)
+            if not events or event in events
+        ]
+        if not matching:
+            continue
+        if changes:
+            changes = {
+                name: [json_value(old), json_value(new)]
+                for name, (old, new) in changes.items()
+            }
+        payload = json.dumps(
+            {"data": object_data(instance), "changes": changes}, cls=DjangoJSONEncoder
+        )
+        subscription_ids.extend(matching)
+        payloads.extend([payload] * len(matching))
+    if not subscription_ids:
+        return 0
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{WebhookDelivery._meta.db_table}" '
+            "(subscription_id, event, payload, status, attempts, next_attempt_at, "
+            "last_error, created_at) "
+            "SELECT subscription.id, %s, queued.payload::jsonb, %s, 0, %s, '', %s "
+            "FROM unnest(%s::bigint[], %s::text[]) AS queued(subscription_id, payload) "
+            f'JOIN "{WebhookSubscription._meta.db_table}" AS subscription '
+            "ON subscription.id = queued.subscription_id AND subscription.is_active",
+            [event, WebhookStatus.PENDING.name, now, now, subscription_ids, payloads],
+        )
+        return cursor.rowcount
+
+
+def sign(secret, timestamp, body):
+    """Hex HMAC-SHA256 of `"<timestamp>.<body>"` under the subscription secret"""
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def batch_body(deliveries):
+    return json.dumps(
+        {
+            "deliveries": [
+                {
+                    "id": delivery.pk,
+                    "event": delivery.event,
+                    "created_at": delivery.created_at,
+                    **delivery.payload,
+                }
+                for delivery in deliveries
+            ]
+        },
+        cls=DjangoJSONEncoder,
+    ).encode()
+
+
+def backoff_seconds(attempts, config):
+    return min(config["BACKOFF_BASE"] * 2 ** (attempts - 1), config["BACKOFF_MAX"])
+
+
+def claim_batch(config):
+    """
+    Lock due deliveries, skipping rows other workers hold, and push their
+    next attempt out by a lease so that they are not sent twice while this
+    worker is posting them. Each post takes at most TIMEOUT and CONCURRENCY
+    run at once, so the lease covers every round of the batch plus one.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        deliveries = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("subscription")
+            .filter(
+                status=WebhookStatus.PENDING.name,
+                next_attempt_at__lte=now,
+                subscription__is_active=True,
+            )
+            .order_by("next_attempt_at")[: config["BATCH_SIZE"]]
+        )
+        subscriptions = len({delivery.subscription_id for delivery in deliveries})
+        rounds = -(-subscriptions // config["CONCURRENCY"])
+        lease = now + timedelta(seconds=(rounds + 1) * config["TIMEOUT"])
+        WebhookDelivery.objects.filter(
+            pk__in=[delivery.pk for delivery in deliveries]
+        ).update(next_attempt_at=lease)
+    for delivery in deliveries:
+        delivery.next_attempt_at = lease
+    return deliveries
+
+
+def group_by_subscription(deliveries):
+    batches = {}
+    for delivery in deliveries:
+        batches.setdefault(delivery.subscription_id, []).append(delivery)
+    return [(batch[0].subscription, batch) for batch in batches.values()]
+
+
+def record_results(results, config):
+    """
+    Mark delivered batches done and schedule failed ones for a retry.
+    Deliveries whose lease ran out and that another worker claimed again
+    are left to that worker.
+    """
+    now = timezone.now()
+    claimed = [delivery for deliveries, _ in results for delivery in deliveries]
+    with transaction.atomic():
+        leases = dict(
+            WebhookDelivery.objects.select_for_update()
+            .filter(
+                pk__in=[delivery.pk for delivery in claimed],
+                status=WebhookStatus.PENDING.name,
+            )
+            .values_list("pk", "next_attempt_at")
+        )
+        delivered, failed = [], []
+        for deliveries, error in results:
+            for delivery in deliveries:
+                if leases.get(delivery.pk) != delivery.next_attempt_at:
+                    continue
+                if error is None:
+                    delivered.append(delivery.pk)
+                    continue
+                delivery.attempts += 1
+                delivery.last_error = error
+                if delivery.attempts >= config["MAX_ATTEMPTS"]:
+                    delivery.status = WebhookStatus.FAILED.name
+                else:
+                    delivery.next_attempt_at = now + timedelta(
+                        seconds=backoff_seconds(delivery.attempts, config)
+                    )
+                failed.append(delivery)
+
+        WebhookDelivery.objects.filter(pk__in=delivered).update(
+            status=WebhookStatus.DELIVERED.name,
+            attempts=F("attempts") + 1,
+            delivered_at=now,
+            last_error="",
+        )
+        WebhookDelivery.objects.bulk_update(
+            failed, ["attempts", "last_error", "status", "next_attempt_at"]
+        )
+    return len(delivered), len(failed)
+
+
+class WebhookSender:
+    """
+    Posts batches concurrently through one pooled httpx.AsyncClient. The
+    event loop and client outlive each send(), so connections to an
+    endpoint are reused from batch to batch while database work stays
+    synchronous in the calling thread.
+
+    asyncio and httpx are imported here rather than at module level: the
+    signal receivers import this module in every process, and only the
+    delivery worker sends anything.
+    """
+
+    def __init__(self, config):
+        import asyncio
+
+        self.config = config
+        self.runner = asyncio.Runner()
+        self.client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.client is not None:
+            self.runner.run(self.client.aclose())
+            self.client = None
+        self.runner.close()
+
+    def send(self, batches):
+        """Post `(subscription, deliveries)` batches; returns `(deliveries, error)` pairs"""
+        return self.runner.run(self.send_all(batches))
+
+    async def send_all(self, batches):
+        import asyncio
+
+        import httpx
+
+        if self.client is None:
+            concurrency = self.config["CONCURRENCY"]
+            self.client = httpx.AsyncClient(
+                timeout=self.config["TIMEOUT"],
+                limits=httpx.Limits(
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency,
+                ),
+                headers={"User-Agent": "ticketapi-webhooks"},
+            )
+        semaphore = asyncio.Semaphore(self.config["CONCURRENCY"])
+        return await asyncio.gather(
+            *(
+                self.post(semaphore, subscription, deliveries)
+                for subscription, deliveries in batches
+            )
+        )
+
+    async def post(self, semaphore, subscription, deliveries):
+        import asyncio
+
+        import httpx
+
+        body = batch_body(deliveries)
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: f"sha256={sign(subscription.secret, timestamp, body)}",
+        }
+        async with semaphore:
+            try:
+                # httpx times each phase separately; bound the whole post.
+                response = await asyncio.wait_for(
+                    self.client.post(subscription.url, content=body, headers=headers),
+                    self.config["TIMEOUT"],
+                )
+            except TimeoutError:
+                return deliveries, f"Timed out after {self.config['TIMEOUT']}s"
+            except httpx.HTTPError as exc:
+                return deliveries, f"{type(exc).__name__}: {exc}"[:1000]
+        if response.is_success:
+            return deliveries, None
+        return deliveries, f"HTTP {response.status_code}"
+
+
+def deliver_pending(sender, config):
+    """Send one claimed batch; returns (delivered, failed) counts"""
+    deliveries = claim_batch(config)
+    if not deliveries:
+        return 0, 0
+    # Checked again before sending, in case the host now resolves elsewhere.
+    batches, results = [], []
+    for subscription, batch in group_by_subscription(deliveries):
+        try:
+            check_url(subscription.url, config)
+        except ValueError as exc:
+            results.append((batch, str(exc)))
+        else:
+            batches.append((subscription, batch))
+    if batches:
+        results += sender.send(batches)
+    return record_results(results, config)
@@ -0,0 +1,183 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .enums import EventTarget, EventType, RoleChoice, SyncModel, TaskStatus
+from .models import STATUS_CODES, Task, TaskTransition, TimeLine
+from .webhooks import enqueue_events
+
+# Statuses each status may move to.
+WORKFLOW = {
+    TaskStatus.OPEN: [TaskStatus.WORKING],
+    TaskStatus.WORKING: [TaskStatus.OPEN, TaskStatus.REVIEW],
+    TaskStatus.REVIEW: [TaskStatus.WORKING, TaskStatus.WAITING_QA],
+    TaskStatus.WAITING_QA: [TaskStatus.WORKING, TaskStatus.AWAITING_RELEASE],
+    TaskStatus.AWAITING_RELEASE: [TaskStatus.WAITING_QA, TaskStatus.CLOSED],
+    TaskStatus.CLOSED: [TaskStatus.OPEN],
+}
+
+# Transitions each role may make; None means every transition in WORKFLOW.
+ROLE_TRANSITIONS = {
+    RoleChoice.MANAGER: None,
+    RoleChoice.DEVELOPER: [
+        (TaskStatus.OPEN, TaskStatus.WORKING),
+        (TaskStatus.WORKING, TaskStatus.OPEN),
+        (TaskStatus.WORKING, TaskStatus.REVIEW),
+        (TaskStatus.REVIEW, TaskStatus.WORKING),
+    ],
+    RoleChoice.DESIGNER: [
+        (TaskStatus.OPEN, TaskStatus.WORKING),
+        (TaskStatus.WORKING, TaskStatus.REVIEW),
+    ],
+    RoleChoice.QA: [
+        (TaskStatus.REVIEW, TaskStatus.WAITING_QA),
+        (TaskStatus.WAITING_QA, TaskStatus.WORKING),
+        (TaskStatus.WAITING_QA, TaskStatus.AWAITING_RELEASE),
+    ],
+}
+
+
+def compile_transitions():
+    """
+    `{(from name, to name): frozenset(role names)}` for every allowed
+    transition, so that checking one is a single dictionary lookup.
+    """
+    edges = {
+        (source, target) for source, targets in WORKFLOW.items() for target in targets
+    }
+    missing = set(TaskStatus) - WORKFLOW.keys()
+    if missing:
+        raise ImproperlyConfigured(
+            f"No workflow for statuses: {', '.join(tag.name for tag in missing)}"
+        )
+
+    table = {}
+    for role, transitions in ROLE_TRANSITIONS.items():
+        allowed = edges if transitions is None else set(transitions)
+        if not allowed <= edges:
+            raise ImproperlyConfigured(
+                f"{role.name} has transitions outside the workflow"
+            )
+        for source, target in allowed:
+            table.setdefault((source.name, target.name), set()).add(role.name)
+    return {edge: frozenset(roles) for edge, roles in table.items()}
+
+
+TRANSITIONS = compile_transitions()
+
+_STATUS_LOOKUP = {
+    **{tag.name.lower(): tag.name for tag in TaskStatus},
+    **{tag.value.lower(): tag.name for tag in TaskStatus},
+}
+
+
+def normalize_status(value):
+    """Status name for a stored or submitted name or value, or None."""
+    if value is None:
+        return None
+    return _STATUS_LOOKUP.get(str(value).lower())
+
+
+def can_transition(role, source, target):
+    return role in TRANSITIONS.get(
+        (normalize_status(source), normalize_status(target)), ()
+    )
+
+
+def allowed_targets(role, source):
+    source = normalize_status(source)
+    return sorted(
+        target
+        for (start, target), roles in TRANSITIONS.items()
+        if start == source and role in roles
+    )
+
+
+def transition_error(role, source, target):
+    """Message explaining why `role` may not move a task from `source` to `target`."""
+    source, target = normalize_status(source), normalize_status(target)
+    if (source, target) not in TRANSITIONS:
+        return f"A task cannot move from {source} to {target}."
+    return f"{role} cannot move a task from {source} to {target}."
+
+
+def record_transitions(changes, actor=None):
+    """
+    Store `(task, previous status)` pairs as TaskTransition rows in one
+    insert. A previous status of None records the status a task started in.
+    """
+    return TaskTransition.objects.bulk_create(
+        TaskTransition(
+            task=task,
+            from_status=(
+                None if previous is None else STATUS_CODES[normalize_status(previous)]
+            ),
+            to_status=STATUS_CODES[normalize_status(task.status)],
+            actor=actor,
+        )
+        for task, previous in changes
+    )
+
+
+def validate_transitions(role, tasks, targets):
+    """
+    Check a set of requested transitions together. `tasks` maps ids to
+    locked Task rows and `targets` maps ids to status names; the result
+    maps the id of every task that may not move to the reason.
+    """
+    errors = {}
+    for task_id, target in targets.items():
+        task = tasks.get(task_id)
+        if task is None:
+            errors[task_id] = "Task not found."
+            continue
+        source = normalize_status(task.status)
+        if source != target and not can_transition(role, source, target):
+            errors[task_id] = transition_error(role, source, target)
+    return errors
+
+
+def apply_transitions(tasks, targets, actor):
+    """
+    Move validated tasks to their target statuses with one UPDATE per
+    target status, then record timeline events, transitions and webhook
+    events in bulk. Call it inside the transaction that locked `tasks`.
+    """
+    now = timezone.now()
+    moved = {}
+    for task_id, target in targets.items():
+        task = tasks[task_id]
+        previous = task.status
+        if normalize_status(previous) == target:
+            continue
+        task.status = target
+        task.updated_at = now
+        moved[task] = previous
+
+    by_target = {}
+    for task in moved:
+        by_target.setdefault(task.status, []).append(task.pk)
+    for target, task_ids in by_target.items():
+        Task.objects.filter(pk__in=task_ids).update(status=target, updated_at=now)
+    for task in moved:
+        task.snapshot_fields({"status", "updated_at"})
+
+    TimeLine.objects.bulk_create(
+        TimeLine(
+            project_id=task.project_id,
+            event_type=EventType.UPDATED.value,
+            target_type=EventTarget.TASK.name,
+            target_id=task.pk,
+            changes={"status": [previous, task.status]},
+        )
+        for task, previous in moved.items()
+    )
+    record_transitions(moved.items(), actor)
+    enqueue_events(
+        SyncModel.TASK,
+        EventType.UPDATED,
+        [
+            (task, {"status": [previous, task.status]})
+            for task, previous in moved.items()
+        ],
+    )
+    return list(moved)